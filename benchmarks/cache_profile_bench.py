@@ -0,0 +1,122 @@
+"""Gateway cache memory per CACHE_PROFILE on a synthetic many-guild bot.
+
+Feeds identical GUILD_CREATE and MESSAGE_CREATE payloads into a client built
+with each profile (no network) and reports what stayed cached.
+
+Run from the repo root:  python -m benchmarks.cache_profile_bench [--guilds 2000 --members 250]
+
+Payloads carry the members a GUILD_CREATE would; with the full profile a real
+bot then also chunks every offline member, so its real footprint is larger.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+import discord
+
+from utils.cache_profile import PROFILES, cache_counts, cache_options
+
+TIMESTAMP = '2024-01-01T00:00:00+00:00'
+
+
+def user(uid):
+    return {'id': str(uid), 'username': f"user{uid}", 'global_name': f"User {uid}", 'discriminator': '0', 'avatar': None}
+
+
+def guild_payload(gid, members, in_voice):
+    text_id, voice_id = gid * 10 + 1, gid * 10 + 2
+    uids = [gid * 100000 + i for i in range(members)]
+    return {
+        'id': str(gid),
+        'name': f"Guild {gid}",
+        'owner_id': str(uids[0]),
+        'member_count': members,
+        'large': members > 250,
+        'features': [],
+        'emojis': [],
+        'stickers': [],
+        'threads': [],
+        'stage_instances': [],
+        'guild_scheduled_events': [],
+        'premium_tier': 0,
+        'roles': [{
+            'id': str(gid), 'name': '@everyone', 'permissions': '0', 'position': 0,
+            'color': 0, 'hoist': False, 'managed': False, 'mentionable': False,
+        }],
+        'channels': [
+            {'id': str(text_id), 'type': 0, 'name': 'general', 'position': 0, 'permission_overwrites': []},
+            {'id': str(voice_id), 'type': 2, 'name': 'Music', 'position': 1, 'permission_overwrites': [], 'bitrate': 64000, 'user_limit': 0},
+        ],
+        'members': [
+            {'user': user(uid), 'roles': [], 'joined_at': TIMESTAMP, 'deaf': False, 'mute': False, 'flags': 0}
+            for uid in uids
+        ],
+        'voice_states': [
+            {
+                'user_id': str(uid), 'channel_id': str(voice_id), 'session_id': 'x',
+                'deaf': False, 'mute': False, 'self_deaf': False, 'self_mute': False,
+                'self_video': False, 'suppress': False, 'request_to_speak_timestamp': None,
+            }
+            for uid in uids[:in_voice]
+        ],
+    }
+
+
+def message_payload(gid, mid, uid):
+    return {
+        'id': str(mid), 'channel_id': str(gid * 10 + 1), 'guild_id': str(gid),
+        'author': user(uid),
+        'member': {'roles': [], 'joined_at': TIMESTAMP, 'deaf': False, 'mute': False, 'flags': 0},
+        'content': "!play never gonna give you up", 'timestamp': TIMESTAMP, 'edited_timestamp': None,
+        'tts': False, 'mention_everyone': False, 'mentions': [], 'mention_roles': [],
+        'attachments': [], 'embeds': [], 'pinned': False, 'type': 0,
+    }
+
+
+def run(profile, args):
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.members = True
+    gc.collect()
+    tracemalloc.start()
+    client = discord.Client(intents=intents, **cache_options(profile))
+    state = client._connection
+    start = time.perf_counter()
+    for g in range(1, args.guilds + 1):
+        gid = 10**12 + g
+        state.parse_guild_create(guild_payload(gid, args.members, args.voice))
+        for m in range(args.messages):
+            state.parse_message_create(message_payload(gid, gid * 1000 + m, gid * 100000 + m % args.members))
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return client, current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--guilds', type=int, default=2000)
+    parser.add_argument('--members', type=int, default=250, help="members per GUILD_CREATE")
+    parser.add_argument('--voice', type=int, default=3, help="members in voice per guild")
+    parser.add_argument('--messages', type=int, default=20, help="messages seen per guild")
+    args = parser.parse_args()
+
+    print(f"{args.guilds} guilds x {args.members} members, {args.voice} in voice, {args.messages} messages each")
+    baseline = None
+    for profile in PROFILES:
+        client, current, elapsed = run(profile, args)
+        counts = cache_counts(client)
+        baseline = baseline or current
+        print(
+            f"  {profile:<8} {current / 1048576:>8.1f} MiB ({current / args.guilds / 1024:.1f} KiB/guild, "
+            f"{current / baseline:.0%} of full)  ingest {elapsed:.2f}s"
+        )
+        print(f"           members {counts['members']}, users {counts['users']}, voice {counts['voice_states']}, messages {counts['messages']}")
+        del client
+        gc.collect()
+
+
+if __name__ == '__main__':
+    main()
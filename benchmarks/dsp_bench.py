@@ -0,0 +1,52 @@
+"""Per-frame CPU cost of the NumPy filter chain, and how many streams fit in a core.
+
+Run from the repo root:  python -m benchmarks.dsp_bench [--frames 3000]
+"""
+import argparse
+
+import numpy as np
+
+from utils.dsp import FilteredPCMSource, FILTERS, FRAME_BYTES, FRAME_BUDGET, SAMPLE_RATE
+
+
+class SyntheticPCM:
+    """Loops one second of a stereo sine sweep, standing in for FFmpegPCMAudio.
+    Frames are generated up front so the benchmark only times the filters."""
+
+    def __init__(self):
+        n = np.arange(SAMPLE_RATE)
+        wave = (np.sin(2 * np.pi * (60 + n / 10) * n / SAMPLE_RATE) * 12000).astype(np.int16)
+        pcm = np.repeat(wave, 2).tobytes()
+        self.frames = [pcm[i:i + FRAME_BYTES] for i in range(0, len(pcm), FRAME_BYTES)]
+        self.index = 0
+
+    def read(self):
+        self.index += 1
+        return self.frames[self.index % len(self.frames)]
+
+    def is_opus(self):
+        return False
+
+    def cleanup(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', type=int, default=3000)
+    args = parser.parse_args()
+
+    print(f"{'filter':<14} {'avg us':>8} {'max us':>8} {'budget':>7} {'streams/core':>13}")
+    for name in FILTERS:
+        for volume in (1.0, 0.7):
+            source = FilteredPCMSource(SyntheticPCM(), volume=volume, filter_name=name)
+            for _ in range(args.frames):
+                assert len(source.read()) == FRAME_BYTES
+            avg = source.avg_frame_time
+            label = name if volume == 1.0 else f"{name}@70%"
+            print(f"{label:<14} {avg * 1e6:>8.1f} {source.max_frame_time * 1e6:>8.1f} "
+                  f"{avg / FRAME_BUDGET:>7.2%} {int(FRAME_BUDGET / avg) if avg else 0:>13}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,437 @@
+"""Stand-ins for Discord, yt-dlp, FFmpeg and the LLM, so the cogs can be driven
+offline. Every simulated REST call sleeps for `rest_latency` and is counted.
+"""
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import types
+
+import numpy as np
+
+from utils.dsp import FRAME_BUDGET, FRAME_SAMPLES, SAMPLE_RATE
+from utils.ipc import LocalIPC
+
+import discord
+
+
+class Stats:
+    """REST calls and voice stream CPU, shared by every fake in a run."""
+
+    def __init__(self, rest_latency=0.05):
+        self.rest_latency = rest_latency
+        self.rest_calls = 0
+        self.stream_cpu = 0.0 # thread CPU seconds spent producing frames
+        self.stream_audio = 0.0 # seconds of audio produced
+        self._lock = threading.Lock()
+
+    async def rest(self):
+        self.rest_calls += 1
+        if self.rest_latency:
+            await asyncio.sleep(self.rest_latency)
+
+    def add_stream(self, cpu, audio):
+        with self._lock:
+            self.stream_cpu += cpu
+            self.stream_audio += audio
+
+
+# --- Discord objects ---
+
+class FakeMessage:
+    _next_id = 1
+
+    def __init__(self, channel, content=None, embed=None, view=None):
+        self.id = FakeMessage._next_id
+        FakeMessage._next_id += 1
+        self.channel = channel
+        self.content = content
+        self.embed = embed
+        self.view = view
+
+    async def edit(self, content=None, embed=None, view=None, **kwargs):
+        await self.channel.stats.rest()
+        self.content = content if content is not None else self.content
+        self.embed = embed if embed is not None else self.embed
+        self.view = view if view is not None else self.view
+        return self
+
+    async def delete(self, **kwargs):
+        await self.channel.stats.rest()
+
+
+class FakeTextChannel:
+    def __init__(self, stats, channel_id, guild):
+        self.stats = stats
+        self.id = channel_id
+        self.guild = guild
+        self.name = 'general'
+        self.sent = 0
+
+    async def send(self, content=None, embed=None, view=None, **kwargs):
+        await self.stats.rest()
+        self.sent += 1
+        return FakeMessage(self, content, embed, view)
+
+    async def delete_messages(self, messages, **kwargs):
+        await self.stats.rest()
+
+    def get_partial_message(self, message_id):
+        message = FakeMessage(self)
+        message.id = message_id
+        return message
+
+    def typing(self):
+        return _Typing(self.stats)
+
+
+class _Typing:
+    def __init__(self, stats):
+        self.stats = stats
+
+    async def __aenter__(self):
+        await self.stats.rest()
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeVoiceState:
+    def __init__(self, channel):
+        self.channel = channel
+
+
+class FakeVoiceChannel:
+    def __init__(self, stats, channel_id, guild):
+        self.stats = stats
+        self.id = channel_id
+        self.guild = guild
+        self.name = 'Music'
+        self.members = []
+
+    @property
+    def voice_states(self):
+        states = {member.id: member.voice for member in self.members}
+        if self.guild.voice_client is not None and self.guild.voice_client.channel is self:
+            states[self.guild.me.id] = FakeVoiceState(self)
+        return states
+
+    async def connect(self, **kwargs):
+        await self.stats.rest()
+        self.guild.voice_client = FakeVoiceClient(self.stats, self)
+        return self.guild.voice_client
+
+
+class FakeMember:
+    def __init__(self, stats, member_id, guild, voice_channel=None):
+        self.stats = stats
+        self.id = member_id
+        self.guild = guild
+        self.name = f"user{member_id}"
+        self.display_name = self.name
+        self.mention = f"<@{member_id}>"
+        self.bot = False
+        self.voice = FakeVoiceState(voice_channel) if voice_channel else None
+
+    async def kick(self, reason=None):
+        await self.stats.rest()
+
+    async def timeout(self, until, reason=None):
+        await self.stats.rest()
+
+    async def move_to(self, channel, **kwargs):
+        await self.stats.rest()
+        self.voice = FakeVoiceState(channel) if channel else None
+
+
+class FakeGuild:
+    def __init__(self, stats, guild_id):
+        self.id = guild_id
+        self.name = f"Guild {guild_id}"
+        self.voice_client = None
+        self.text_channel = FakeTextChannel(stats, guild_id * 10 + 1, self)
+        self.voice_channel = FakeVoiceChannel(stats, guild_id * 10 + 2, self)
+        self.members = [FakeMember(stats, guild_id * 1000 + i, self, self.voice_channel) for i in range(5)]
+        self.voice_channel.members = list(self.members)
+        self.me = FakeMember(stats, 1, self)
+        self.me.bot = True
+
+    def get_member(self, member_id):
+        return next((m for m in self.members if m.id == member_id), None)
+
+
+class FakeCommand:
+    def __init__(self, name):
+        self.name = self.qualified_name = name
+
+
+class FakeContext:
+    """Just enough of commands.Context for the cogs' command bodies."""
+
+    def __init__(self, bot, guild, author, command='', cog=None):
+        self.bot = bot
+        self.guild = guild
+        self.author = author
+        self.channel = guild.text_channel
+        self.message = FakeMessage(self.channel, '')
+        self.command = FakeCommand(command)
+        self.cog = cog
+        self.command_failed = False
+
+    @property
+    def voice_client(self):
+        return self.guild.voice_client
+
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+    def typing(self):
+        return self.channel.typing()
+
+
+class FakeResponse:
+    def __init__(self, stats):
+        self.stats = stats
+        self.done = False
+
+    async def send_message(self, content=None, **kwargs):
+        await self.stats.rest()
+        self.done = True
+
+    async def edit_message(self, **kwargs):
+        await self.stats.rest()
+        self.done = True
+
+    async def defer(self, **kwargs):
+        await self.stats.rest()
+        self.done = True
+
+    def is_done(self):
+        return self.done
+
+
+class FakeFollowup:
+    def __init__(self, stats):
+        self.stats = stats
+
+    async def send(self, content=None, **kwargs):
+        await self.stats.rest()
+
+
+class FakeInteraction:
+    def __init__(self, stats, guild, user, message=None):
+        self.guild = guild
+        self.user = user
+        self.message = message
+        self.channel = guild.text_channel
+        self.response = FakeResponse(stats)
+        self.followup = FakeFollowup(stats)
+
+
+# --- Voice ---
+
+class SyntheticPCM(discord.AudioSource):
+    """`seconds` of a stereo sine as s16le frames, in place of FFmpegPCMAudio."""
+
+    _frame = None
+
+    def __init__(self, seconds):
+        if SyntheticPCM._frame is None:
+            t = np.arange(FRAME_SAMPLES) / SAMPLE_RATE
+            tone = (np.sin(2 * np.pi * 1000 * t) * 8000).astype(np.int16) # 1 kHz: whole cycles per frame
+            SyntheticPCM._frame = np.repeat(tone[:, None], 2, axis=1).tobytes()
+        self.remaining = int(seconds / FRAME_BUDGET)
+
+    def read(self):
+        if self.remaining <= 0:
+            return b''
+        self.remaining -= 1
+        return self._frame
+
+    def is_opus(self):
+        return False
+
+
+class FakeVoiceClient:
+    """Plays a source on a thread that reads one frame every 20 ms, like
+    discord.py's AudioPlayer, and records the CPU that thread uses."""
+
+    def __init__(self, stats, channel):
+        self.stats = stats
+        self.channel = channel
+        self.guild = channel.guild
+        self.source = None
+        self._end = threading.Event()
+        self._end.set()
+        self._resumed = threading.Event()
+        self._resumed.set()
+
+    def play(self, source, after=None):
+        if self.is_playing() or self.is_paused():
+            raise discord.ClientException('Already playing audio.')
+        self.source = source
+        self._end = threading.Event()
+        self._resumed.set()
+        threading.Thread(target=self._run, args=(source, after, self._end), daemon=True).start()
+
+    def _run(self, source, after, stop):
+        cpu_start = time.thread_time()
+        frames = 0
+        next_at = time.perf_counter()
+        while not stop.is_set():
+            self._resumed.wait()
+            data = source.read()
+            if not data or stop.is_set():
+                break
+            frames += 1
+            next_at += FRAME_BUDGET
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        stop.set() # Like AudioPlayer: no longer playing by the time `after` runs
+        self.stats.add_stream(time.thread_time() - cpu_start, frames * FRAME_BUDGET)
+        source.cleanup()
+        if after is not None:
+            after(None)
+
+    def is_playing(self):
+        return not self._end.is_set() and self._resumed.is_set()
+
+    def is_paused(self):
+        return not self._end.is_set() and not self._resumed.is_set()
+
+    def is_connected(self):
+        return True
+
+    def pause(self):
+        self._resumed.clear()
+
+    def resume(self):
+        self._resumed.set()
+
+    def stop(self):
+        self._end.set()
+        self._resumed.set()
+
+    async def move_to(self, channel):
+        await self.stats.rest()
+        self.channel = channel
+
+    async def disconnect(self, **kwargs):
+        await self.stats.rest()
+        self.stop()
+        self.guild.voice_client = None
+
+
+# --- Services ---
+
+class StubExtractor:
+    """Replaces ExtractionService: returns yt-dlp-shaped info after `latency` seconds.
+    Playlists have `playlist_size` entries; listing them costs `latency` per
+    100 entries up to the last one asked for, like YouTube's continuation pages."""
+
+    def __init__(self, latency=0.3, track_seconds=30, playlist_size=50):
+        self.latency = latency
+        self.track_seconds = track_seconds
+        self.playlist_size = playlist_size
+        self.calls = 0
+
+    async def extract(self, query, guild_id=None, options=None):
+        self.calls += 1
+        n = abs(hash(query)) % 10**11
+        if options and options.get('extract_flat') and not query.startswith('ytsearch'):
+            start = options.get('playliststart', 1) - 1
+            end = min(self.playlist_size, options.get('playlistend') or self.playlist_size)
+            await asyncio.sleep(self.latency * max(1, -(-end // 100)))
+            return {'title': f"Playlist {n}", 'entries': [
+                {'id': f"{n + i:011d}", 'title': f"Entry {i}", 'url': f"https://www.youtube.com/watch?v={n + i:011d}",
+                 'duration': self.track_seconds}
+                for i in range(start, end)
+            ]}
+        await asyncio.sleep(self.latency)
+        if query.startswith('ytsearch'):
+            # Flat search results: the right song, a live version and something unrelated.
+            text = query.split(':', 1)[1]
+            return {'title': text, 'entries': [
+                {'id': f"{n + i:011d}", 'title': title, 'url': f"https://www.youtube.com/watch?v={n + i:011d}",
+                 'duration': duration, 'channel': "Synthetic"}
+                for i, (title, duration) in enumerate([
+                    (f"{text} (Live)", self.track_seconds + 40),
+                    (f"{text} (Official Audio)", self.track_seconds),
+                    ("Top 10 songs of the year", 900),
+                ])
+            ]}
+        video_id = f"{n:011d}"
+        return {
+            'id': video_id,
+            'title': f"Result for {query}",
+            'url': f"https://rr1---sn.googlevideo.com/videoplayback?expire={int(time.time()) + 21600}&id={video_id}",
+            'webpage_url': f"https://www.youtube.com/watch?v={video_id}",
+            'duration': self.track_seconds,
+            'thumbnail': f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg",
+            'uploader': "Synthetic",
+            'acodec': 'opus',
+        }
+
+    def stats(self):
+        return {'mode': 'stub', 'workers': 0, 'running': 0, 'queued': 0, 'waiting_guilds': 0,
+                'completed': self.calls, 'failed': 0, 'deduplicated': 0, 'avg_wait': 0.0, 'max_wait': 0.0}
+
+    def shutdown(self):
+        pass
+
+
+class FakeBot:
+    """The parts of the bot the cogs touch outside of commands."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.ipc = LocalIPC()
+        self.guilds = []
+        self.voice_clients = []
+        self.latency = 0.05
+        self.user = types.SimpleNamespace(id=1) # FakeGuild.me
+
+    def get_guild(self, guild_id):
+        return next((g for g in self.guilds if g.id == guild_id), None)
+
+    def dispatch(self, *args, **kwargs):
+        pass
+
+
+# --- Setup ---
+
+def bench_environment():
+    """Points the track cache and saved queues at a fresh temporary directory
+    and turns the audio cache off, so a run never touches the real ones.
+    Call before building any cog; returns the directory."""
+    tmp = tempfile.mkdtemp(prefix='antigravity-bench-')
+    os.environ['TRACK_CACHE_PATH'] = os.path.join(tmp, 'track_cache.db')
+    os.environ['QUEUE_STATE_PATH'] = os.path.join(tmp, 'queues.db')
+    os.environ['AUDIO_CACHE_MB'] = '0'
+    return tmp
+
+
+def build_music_cog(bot, extractor, speedup=1.0, seconds=None, mixins=()):
+    """The real MusicCog with FFmpeg and yt-dlp swapped out: `extractor`
+    replaces the ExtractionService, and every track plays SyntheticPCM for
+    its duration (or `seconds`) divided by `speedup`. `mixins` go in front
+    of the cog's own methods."""
+    from cogs import music
+    from utils.dsp import FilteredPCMSource
+
+    # The commands check for an FFmpeg binary before doing anything; none is spawned here.
+    music.shutil = types.SimpleNamespace(which=lambda name: name)
+
+    class BenchMusicCog(*mixins, music.MusicCog):
+        def create_source(self, song, queue, offset=0.0, local=None):
+            length = seconds or max(0.0, (song.duration or extractor.track_seconds) - offset)
+            return FilteredPCMSource(SyntheticPCM(length / speedup), volume=queue.effective_volume, filter_name=queue.filter)
+
+    cog = BenchMusicCog(bot)
+    cog.extractor.shutdown()
+    cog.extractor = extractor
+    for command in cog.walk_commands():
+        command.cog = cog # What bot.add_cog does, so `cog.play(ctx, ...)` works
+    return cog
@@ -0,0 +1,264 @@
+"""Offline load test: N simulated guilds issuing commands to every cog at once.
+
+Discord, yt-dlp, FFmpeg and Gemini are replaced by the fakes in
+benchmarks/fakes.py (REST calls sleep --rest-latency, extractions sleep
+--extract-latency, audio is a synthetic PCM tone read at real-time pace).
+Reports commands/s, p50/p99 latency per command, memory per guild and CPU per
+voice stream, and saves everything as JSON.
+
+Run from the repo root:
+    python -m benchmarks.load_test [--guilds 50 --duration 30]
+    python -m benchmarks.load_test --compare data/bench/old.json            # run, then compare
+    python -m benchmarks.load_test --compare data/bench/a.json data/bench/b.json
+"""
+import argparse
+import asyncio
+import datetime
+import gc
+import json
+import os
+import platform
+import random
+import time
+import tracemalloc
+
+from benchmarks.fakes import (
+    FakeBot, FakeContext, FakeGuild, FakeInteraction, Stats, StubExtractor, bench_environment, build_music_cog
+)
+
+
+def percentile(samples, q):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def build_cogs(bot, args):
+    """Instantiates the real cogs, with FFmpeg and yt-dlp swapped out."""
+    from cogs.ai import AICog
+    from cogs.fun import FunCog
+    from cogs.moderation import ModerationCog
+
+    cogs = {
+        'music': build_music_cog(bot, StubExtractor(latency=args.extract_latency, track_seconds=args.track_seconds)),
+        'ai': AICog(bot),
+        'moderation': ModerationCog(bot),
+        'fun': FunCog(bot),
+    }
+    for instance in cogs.values():
+        for command in instance.walk_commands():
+            command.cog = instance # What bot.add_cog does, so `cog.play(ctx, ...)` works
+    return cogs
+
+
+def actions(cogs, stats, rng):
+    """Command name -> (weight, coroutine function taking a FakeContext)."""
+    from cogs.music import MusicPlayerView
+    music, ai, moderation, fun = cogs['music'], cogs['ai'], cogs['moderation'], cogs['fun']
+
+    def button(name):
+        async def press(ctx):
+            view = MusicPlayerView(music)
+            await getattr(view, name).callback(FakeInteraction(stats, ctx.guild, ctx.author))
+        return press
+
+    async def set_filter(ctx):
+        music.get_queue(ctx.guild.id).filter = rng.choice(['none', 'bass', 'nightcore', '8d'])
+        await music.apply_settings(ctx)
+
+    return {
+        'play': (30, lambda ctx: music.play(ctx, query=f"synthetic song {rng.randrange(200)}")),
+        'queue': (10, lambda ctx: music.show_queue(ctx)),
+        'skip': (5, lambda ctx: music.skip(ctx)),
+        'forward': (3, lambda ctx: music.forward(ctx, 10)),
+        'button:vol_up': (5, button('vol_up')),
+        'button:pause_resume': (3, button('pause_resume')),
+        'button:shuffle': (3, button('shuffle')),
+        'filter': (3, set_filter),
+        'chat': (10, lambda ctx: ai.chat(ctx, query=rng.choice(["hi", "tell me a joke", f"what is {rng.randrange(1000)}?"]))),
+        'aistats': (2, lambda ctx: ai.aistats(ctx)),
+        'yeet': (2, lambda ctx: moderation.yeet(ctx, ctx.guild.members[-1], reason="load test")),
+        'silence': (2, lambda ctx: moderation.silence(ctx, ctx.guild.members[-2])),
+        'iq': (8, lambda ctx: fun.iq(ctx)),
+        'roast': (7, lambda ctx: fun.roast(ctx)),
+        'fortune': (7, lambda ctx: fun.fortune(ctx)),
+    }
+
+
+async def warm_up(bot, guild, cogs, args):
+    """One guild's steady state: connected, a song playing, a queue, a conversation."""
+    author = guild.members[0]
+    ctx = FakeContext(bot, guild, author)
+    await cogs['music'].play(ctx, query=f"warm-up {guild.id}")
+    for i in range(args.queue):
+        await cogs['music'].play(ctx, query=f"queued {guild.id} {i}")
+    await cogs['ai'].chat(ctx, query="hello there")
+
+
+async def guild_worker(bot, guild, table, args, deadline, latencies, errors, seed):
+    rng = random.Random(seed)
+    names = list(table)
+    weights = [table[name][0] for name in names]
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        ctx = FakeContext(bot, guild, rng.choice(guild.members[:3]), command=name)
+        start = time.perf_counter()
+        try:
+            await table[name][1](ctx)
+        except Exception as e:
+            errors[name] = errors.get(name, 0) + 1
+            if errors[name] == 1:
+                print(f"  {name} raised {type(e).__name__}: {e}")
+        latencies.setdefault(name, []).append(time.perf_counter() - start)
+        await asyncio.sleep(rng.expovariate(1 / args.interval))
+
+
+async def run(args):
+    from utils.metrics import LoopLagMonitor, Registry
+
+    loop = asyncio.get_running_loop()
+    bot = FakeBot(loop)
+    stats = Stats(rest_latency=args.rest_latency)
+    guilds = [FakeGuild(stats, 10_000 + i) for i in range(args.guilds)]
+    bot.guilds = guilds
+    cogs = build_cogs(bot, args)
+
+    # Phase 1: memory per guild, from an identical warm-up in every guild.
+    gc.collect()
+    tracemalloc.start()
+    await asyncio.gather(*(warm_up(bot, g, cogs, args) for g in guilds))
+    gc.collect()
+    warm_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Phase 2: every guild issues commands until the deadline.
+    lag = LoopLagMonitor(registry=Registry(), interval=0.1)
+    lag.start()
+    table = actions(cogs, stats, random.Random(args.seed))
+    latencies, errors = {}, {}
+    rest_before, cpu_before = stats.rest_calls, time.process_time()
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        guild_worker(bot, g, table, args, start + args.duration, latencies, errors, args.seed + i)
+        for i, g in enumerate(guilds)
+    ))
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_before
+    lag.stop()
+
+    for guild in guilds:
+        cogs['music'].get_queue(guild.id).clear()
+        if guild.voice_client:
+            await guild.voice_client.disconnect()
+    cogs['music'].cog_unload()
+    await asyncio.sleep(0.1) # Let the player threads record their CPU
+
+    everything = [s for samples in latencies.values() for s in samples]
+    return {
+        'commands': len(everything),
+        'commands_per_sec': len(everything) / elapsed,
+        'p50_ms': percentile(everything, 0.5) * 1000,
+        'p99_ms': percentile(everything, 0.99) * 1000,
+        'errors': sum(errors.values()),
+        'per_command': {
+            name: {
+                'count': len(samples),
+                'p50_ms': percentile(samples, 0.5) * 1000,
+                'p99_ms': percentile(samples, 0.99) * 1000,
+                'errors': errors.get(name, 0),
+            }
+            for name, samples in sorted(latencies.items())
+        },
+        'memory_per_guild_kib': warm_bytes / args.guilds / 1024,
+        'cpu_per_stream': stats.stream_cpu / stats.stream_audio if stats.stream_audio else 0.0, # CPU s per audio s
+        'process_cpu_percent': cpu / elapsed * 100,
+        'loop_lag_p99_ms': lag.histogram.quantile(0.99) * 1000,
+        'rest_calls_per_command': (stats.rest_calls - rest_before) / max(1, len(everything)),
+        'extractions': cogs['music'].extractor.calls,
+    }
+
+
+def report(results):
+    print(f"{results['commands']} commands, {results['commands_per_sec']:.1f}/s, "
+          f"p50 {results['p50_ms']:.1f}ms, p99 {results['p99_ms']:.1f}ms, {results['errors']} errors")
+    print(f"{'command':<22}{'count':>7}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, row in results['per_command'].items():
+        print(f"{name:<22}{row['count']:>7}{row['p50_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['errors']:>8}")
+    print(f"Memory per guild: {results['memory_per_guild_kib']:.1f} KiB")
+    print(f"CPU per voice stream: {results['cpu_per_stream'] * 100:.2f}% of a core")
+    print(f"Process CPU: {results['process_cpu_percent']:.0f}% | loop lag p99 {results['loop_lag_p99_ms']:.0f}ms | "
+          f"{results['rest_calls_per_command']:.2f} REST calls/command | {results['extractions']} extractions")
+
+
+# Lower is better for all of these except commands_per_sec.
+COMPARED = ('commands_per_sec', 'p50_ms', 'p99_ms', 'errors', 'memory_per_guild_kib', 'cpu_per_stream',
+            'process_cpu_percent', 'loop_lag_p99_ms', 'rest_calls_per_command')
+
+
+def compare(old, new):
+    print(f"{'metric':<24}{'old':>12}{'new':>12}{'change':>10}")
+    for key in COMPARED:
+        a, b = old['results'].get(key), new['results'].get(key)
+        if a is None or b is None:
+            continue
+        change = f"{(b - a) / a:+.1%}" if a else "n/a"
+        print(f"{key:<24}{a:>12.4g}{b:>12.4g}{change:>10}")
+    names = sorted(set(old['results']['per_command']) | set(new['results']['per_command']))
+    print(f"{'p99 by command':<24}")
+    for name in names:
+        a = old['results']['per_command'].get(name, {}).get('p99_ms')
+        b = new['results']['per_command'].get(name, {}).get('p99_ms')
+        if a and b:
+            print(f"  {name:<22}{a:>12.1f}{b:>12.1f}{(b - a) / a:>+10.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--guilds', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=30, help="seconds of load")
+    parser.add_argument('--interval', type=float, default=2.0, help="mean seconds between a guild's commands")
+    parser.add_argument('--queue', type=int, default=10, help="songs queued per guild before the run")
+    parser.add_argument('--track-seconds', type=int, default=20)
+    parser.add_argument('--rest-latency', type=float, default=0.05)
+    parser.add_argument('--extract-latency', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="JSON file to write (default data/bench/load-<time>.json)")
+    parser.add_argument('--compare', nargs='+', metavar='JSON', help="OLD [NEW]: compare two runs, or OLD with a fresh run")
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[0]) as a, open(args.compare[1]) as b:
+            compare(json.load(a), json.load(b))
+        return
+
+    # Keep the run's caches away from the real ones; let the AI limiter admit the load.
+    bench_environment()
+    os.environ['AI_BACKEND'] = 'fake'
+    for key, value in (('AI_RATE', '100'), ('AI_BURST', '100'), ('AI_CONCURRENCY', '64'),
+                       ('AI_MAX_WAITING', '500'), ('AI_FAKE_LATENCY', '0.5')):
+        os.environ.setdefault(key, value)
+
+    print(f"{args.guilds} guilds for {args.duration:g}s, one command every ~{args.interval:g}s per guild")
+    results = asyncio.run(run(args))
+    report(results)
+
+    document = {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'config': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        'results': results,
+    }
+    path = args.output or os.path.join('data', 'bench', f"load-{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2)
+    print(f"Saved {path}")
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            compare(json.load(f), document)
+
+
+if __name__ == '__main__':
+    main()
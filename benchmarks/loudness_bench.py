@@ -0,0 +1,145 @@
+"""Loudness analysis: meter accuracy, analysis speed and CPU share, and what
+the normalization gain costs at playback.
+
+1. BS.1770 reference signals through LoudnessMeter (a full-scale 997 Hz sine
+   on one channel reads -3.01 LUFS).
+2. --minutes of synthetic music-like noise measured by a LoudnessAnalyzer
+   with a stand-in decoder, at full speed and at LOUDNESS_CPU=--cpu-share,
+   then looked up again through a reopened track cache (a restart). The
+   "slow decoder" run makes every chunk from scratch in the worker thread,
+   standing in for the time spent waiting on FFmpeg, which the CPU share
+   has to cover too.
+3. Per-frame cost of FilteredPCMSource untouched, with a volume and with a
+   volume plus a normalization gain.
+
+FFmpeg decoding itself isn't measured; the stand-in decoder yields the same
+10-second float chunks `utils.loudness.decode` does.
+
+Run from the repo root:
+    python -m benchmarks.loudness_bench [--minutes 10 --cpu-share 0.5]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.fakes import SyntheticPCM
+from utils.dsp import FRAME_SAMPLES, SAMPLE_RATE, FilteredPCMSource
+from utils.loudness import CHUNK_SECONDS, LoudnessAnalyzer, LoudnessMeter
+from utils.track_cache import TrackCache
+
+
+def sine(seconds, frequency=997.0, level_db=0.0, channels=(0, 1)):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    tone = (10 ** (level_db / 20) * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+    pcm = np.zeros((len(t), 2), dtype=np.float32)
+    for channel in channels:
+        pcm[:, channel] = tone
+    return pcm
+
+
+def accuracy():
+    cases = (
+        ("997 Hz 0 dBFS, left only", sine(10, channels=(0,)), -3.01),
+        ("997 Hz 0 dBFS, both", sine(10), 0.0),
+        ("997 Hz -20 dBFS, both", sine(10, level_db=-20), -20.0),
+        # Gating: 10 s at -20 dBFS and 10 s far below the relative gate read as the loud part alone.
+        ("-20 dBFS then -60 dBFS", np.concatenate((sine(10, level_db=-20), sine(10, level_db=-60))), -20.0),
+    )
+    print("Meter accuracy:")
+    for label, pcm, expected in cases:
+        meter = LoudnessMeter()
+        meter.add(pcm)
+        lufs = meter.integrated()
+        print(f"  {label:<28} {lufs:8.3f} LUFS (expected {expected:.2f})")
+    meter = LoudnessMeter()
+    meter.add(np.zeros((SAMPLE_RATE, 2), dtype=np.float32))
+    print(f"  {'silence':<28} {meter.integrated()} (no gain applied)")
+
+
+def pink_chunk(rng, i):
+    """10 s of pink noise (1/f, roughly a music spectrum) with a slow level swell."""
+    n = CHUNK_SECONDS * SAMPLE_RATE
+    spectrum = np.fft.rfft(rng.standard_normal((n, 2)), axis=0)
+    spectrum[1:] /= np.sqrt(np.arange(1, len(spectrum)))[:, None]
+    spectrum[0] = 0
+    pink = np.fft.irfft(spectrum, n, axis=0)
+    pink *= 0.25 / pink.std()
+    swell = 0.7 + 0.3 * np.sin(2 * np.pi * (i * CHUNK_SECONDS + np.arange(n) / SAMPLE_RATE) / 30)
+    return np.clip(pink * swell[:, None], -1, 1).astype(np.float32)
+
+
+def noise_decoder(minutes, seed=1, slow=False):
+    """Stand-in for `decode`. Normally the chunks are made up front and cost
+    next to nothing; `slow` makes each one when it is read."""
+    chunks = [pink_chunk(np.random.default_rng(seed), i) for i in range(3)]
+
+    def decoder(path, before_options='', max_seconds=None):
+        rng = np.random.default_rng(seed)
+        total = minutes * 60 if not max_seconds else min(minutes * 60, max_seconds)
+        for i in range(int(total) // CHUNK_SECONDS):
+            yield pink_chunk(rng, i) if slow else chunks[i % len(chunks)]
+    return decoder
+
+
+def analysis(args, tmp):
+    path = os.path.join(tmp, 'track_cache.db')
+    store = TrackCache(path)
+    results = []
+    for label, share, slow in (("full speed", 1.0, False), (f"cpu share {args.cpu_share}", args.cpu_share, False),
+                               ("slow decoder, full speed", 1.0, True),
+                               (f"slow decoder, cpu share {args.cpu_share}", args.cpu_share, True)):
+        decoder = noise_decoder(args.minutes, slow=slow)
+        analyzer = LoudnessAnalyzer(store, cpu_share=share, decoder=decoder, max_seconds=args.minutes * 60)
+        video_id = f"bench{len(results)}"
+        cpu = time.process_time()
+        start = time.perf_counter()
+        analyzer.request(video_id, 'stand-in')
+        analyzer.executor.shutdown(wait=True)
+        wall = time.perf_counter() - start
+        cpu = time.process_time() - cpu
+        results.append(video_id)
+        row = store.get_loudness(video_id)
+        print(f"Analysis ({label}): {args.minutes} min of audio in {wall:.2f}s wall = {args.minutes * 60 / wall:.0f}x real time, "
+              f"{cpu / wall:.0%} of one core; {row['lufs']:.2f} LUFS, peak {row['peak']:.3f} -> gain {row['gain']:+.2f} dB")
+    store.close()
+
+    reopened = TrackCache(path) # As after a restart
+    analyzer = LoudnessAnalyzer(reopened)
+    start = time.perf_counter()
+    gains = [analyzer.gain_db(video_id) for video_id in results]
+    lookup = time.perf_counter() - start
+    queued = analyzer.request(results[0], 'stand-in')
+    print(f"After a restart: gains {gains} read in {lookup * 1e3:.2f}ms; re-analysis queued: {queued}")
+    analyzer.shutdown()
+    reopened.close()
+
+
+def frame_cost(args):
+    print("Per-frame cost (20 ms of audio):")
+    for label, volume, gain in (("untouched", 1.0, 1.0), ("volume 0.8", 0.8, 1.0), ("volume 0.8 + gain -4.2 dB", 0.8, 0.617)):
+        source = FilteredPCMSource(SyntheticPCM(args.frames * FRAME_SAMPLES / SAMPLE_RATE), volume=volume, gain=gain)
+        start = time.perf_counter()
+        while source.read():
+            pass
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<26} {elapsed / source.frames * 1e6:6.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--minutes', type=int, default=10)
+    parser.add_argument('--cpu-share', type=float, default=0.5)
+    parser.add_argument('--frames', type=int, default=20_000)
+    args = parser.parse_args()
+
+    accuracy()
+    with tempfile.TemporaryDirectory(prefix='antigravity-bench-') as tmp:
+        analysis(args, tmp)
+    frame_cost(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""REST calls per hour of playback for the now-playing message(s).
+
+Each guild queues --tracks songs of --track-seconds and plays them through,
+with one burst of control presses (volume, loop) and one !queue per track.
+Time is compressed by --speedup: the synthetic audio and the cog's panel
+timings are both scaled down, so an hour of playback takes a few minutes. Channel calls (messages
+sent/edited/deleted) and interaction responses are counted separately.
+
+--mode before replays how the cog behaved before the panel: a new embed with
+its own controls posted for every track, and every press answered with an
+ephemeral message. Set PANEL_PROGRESS_INTERVAL to add the progress bar ticker.
+
+Run from the repo root:
+    python -m benchmarks.panel_bench [--guilds 5 --tracks 8 --track-seconds 210 --speedup 30]
+    python -m benchmarks.panel_bench --mode before
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.fakes import (
+    FakeBot, FakeContext, FakeGuild, FakeInteraction, Stats, StubExtractor, bench_environment, build_music_cog
+)
+
+BURST = ('vol_up', 'vol_up', 'vol_down', 'loop_mode', 'loop_mode', 'loop_mode') # Loop ends back at off
+
+
+class BeforePanels:
+    """Mixed into the cog for --mode before: no panel, a new message per track."""
+
+    def show_panel(self, ctx, message=None):
+        from cogs.music import MusicPlayerView
+
+        if message is not None:
+            return False # enqueue deletes the search message
+        song = self.get_queue(ctx.guild.id).current_song
+        self.bot.loop.create_task(ctx.send(embed=song.create_embed(), view=MusicPlayerView(self)))
+
+    def refresh_panel(self, guild_id):
+        pass
+
+    async def answer_with_panel(self, interaction, text):
+        await interaction.response.send_message(text, ephemeral=True)
+
+
+def build_cog(bot, args):
+    cog = build_music_cog(bot, StubExtractor(latency=0.05, track_seconds=args.track_seconds), speedup=args.speedup,
+                          mixins=(BeforePanels,) if args.mode == 'before' else ())
+    cog.panel_debounce /= args.speedup
+    cog.panel_min_interval /= args.speedup
+    cog.panel_bucket.rate *= args.speedup
+    return cog
+
+
+async def session(cog, bot, guild, interactions, args, rng):
+    from cogs.music import MusicPlayerView
+
+    ctx = FakeContext(bot, guild, guild.members[0], command='play')
+    for i in range(args.tracks):
+        await cog.play(ctx, query=f"panel bench {guild.id} {i}")
+    queue = cog.get_queue(guild.id)
+    view = MusicPlayerView(cog)
+    for _ in range(args.tracks):
+        song = queue.current_song
+        await asyncio.sleep(rng.uniform(0.2, 0.6) * args.track_seconds / args.speedup)
+        for name in BURST:
+            message = queue.panel.message if queue.panel else None # Pressed on the panel
+            await getattr(view, name).callback(FakeInteraction(interactions, guild, guild.members[1], message=message))
+            await asyncio.sleep(0.3 / args.speedup) # A person pressing buttons
+        await asyncio.sleep(rng.uniform(0.1, 0.2) * args.track_seconds / args.speedup)
+        await cog.show_queue(ctx)
+        await cog.cog_after_invoke(ctx) # As the command framework would
+        while queue.current_song is song and song is not None:
+            await asyncio.sleep(0.05)
+    while guild.voice_client.is_playing() or queue.current_song:
+        await asyncio.sleep(0.05)
+
+
+async def run(args):
+    bot = FakeBot(asyncio.get_running_loop())
+    stats = Stats(rest_latency=args.rest_latency)
+    interactions = Stats(rest_latency=args.rest_latency)
+    guilds = [FakeGuild(stats, 20_000 + i) for i in range(args.guilds)]
+    bot.guilds = guilds
+    cog = build_cog(bot, args)
+    if cog.panel_progress_seconds:
+        cog.panel_ticker.change_interval(seconds=cog.panel_progress_seconds / args.speedup)
+        cog.panel_ticker.start()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(cog, bot, g, interactions, args, random.Random(args.seed + i)) for i, g in enumerate(guilds)))
+    await asyncio.sleep(2 * (cog.panel_debounce + cog.panel_min_interval)) # Let the last updates land
+    elapsed = time.perf_counter() - start
+    cog.cog_unload()
+
+    hours = args.guilds * args.tracks * args.track_seconds / 3600
+    return {
+        'playback_hours': hours,
+        'elapsed': elapsed,
+        'channel_per_hour': stats.rest_calls / hours,
+        'interaction_per_hour': interactions.rest_calls / hours,
+        'messages_per_hour': sum(g.text_channel.sent for g in guilds) / hours,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mode', choices=('panel', 'before'), default='panel')
+    parser.add_argument('--guilds', type=int, default=5)
+    parser.add_argument('--tracks', type=int, default=8, help="tracks played per guild")
+    parser.add_argument('--track-seconds', type=int, default=210)
+    parser.add_argument('--speedup', type=float, default=30, help="simulated seconds per real second")
+    parser.add_argument('--rest-latency', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    bench_environment()
+
+    print(f"[{args.mode}] {args.guilds} guilds x {args.tracks} tracks of {args.track_seconds}s, {len(BURST)} control presses per track, "
+          f"{args.speedup:g}x speed")
+    results = asyncio.run(run(args))
+    print(f"{results['playback_hours']:.2f} playback hours simulated in {results['elapsed']:.0f}s")
+    print(f"Per playback hour: {results['channel_per_hour']:.0f} channel REST calls "
+          f"({results['messages_per_hour']:.0f} new messages), {results['interaction_per_hour']:.0f} interaction responses, "
+          f"{results['channel_per_hour'] + results['interaction_per_hour']:.0f} total")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Memory and latency of MusicQueue for one guild with a very long queue, and
+what saving and restoring it through QueueStateStore costs: time on the event
+loop, time in the writer thread and bytes appended to the SQLite WAL.
+
+Run from the repo root:  python -m benchmarks.queue_bench [--size 50000]
+"""
+import argparse
+import asyncio
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from cogs.music import Song, MusicQueue
+from utils.state_store import QueueStateStore
+
+
+class FakeRequester:
+    id = 1
+    mention = "<@1>"
+
+
+def make_info(i):
+    return {
+        'title': f"Track number {i}",
+        'url': f"https://rr1---sn.googlevideo.com/videoplayback?expire=1900000000&id={i:011d}",
+        'webpage_url': f"https://www.youtube.com/watch?v={i:011d}",
+        'duration': 180 + i % 120,
+        'thumbnail': f"https://i.ytimg.com/vi/{i:011d}/hqdefault.jpg",
+        'uploader': "Some Channel",
+        'expires_at': 1900000000.0,
+    }
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6 # microseconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=50000)
+    args = parser.parse_args()
+    requester = FakeRequester()
+
+    gc.collect()
+    tracemalloc.start()
+    queue = MusicQueue()
+    for i in range(args.size):
+        queue.add(Song(make_info(i), requester))
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{args.size} songs: {current / 1024 / 1024:.1f} MiB ({current / args.size:.0f} B/song), peak {peak / 1024 / 1024:.1f} MiB")
+
+    mid = len(queue) // 2
+    results = {
+        'next': timed(queue.next, 1000),
+        'prev': timed(queue.prev, 10),
+        'peek': timed(queue.peek, 1000),
+        'add': timed(lambda: queue.add(Song(make_info(0), requester)), 1000),
+        'remove(mid)': timed(lambda: queue.remove(mid), 100),
+        'move(mid->0)': timed(lambda: queue.move(mid, 0), 100),
+        'jump(100)': timed(lambda: queue.jump(100), 10),
+        'page(mid)': timed(lambda: queue.page(mid // 10), 100),
+        'shuffle': timed(queue.shuffle, 3),
+        'dedupe': timed(queue.dedupe, 3),
+    }
+    for name, micros in results.items():
+        print(f"  {name:<14} {micros:>10.1f} us")
+
+    # The list.pop(0) this replaced, for comparison.
+    legacy = list(range(args.size))
+    print(f"  {'list.pop(0)':<14} {timed(lambda: legacy.pop(0), 1000):>10.1f} us (previous implementation)")
+
+    with tempfile.TemporaryDirectory(prefix='antigravity-bench-') as tmp:
+        asyncio.run(saved_state(queue, requester, os.path.join(tmp, 'queues.db')))
+
+
+async def saved_state(queue, requester, path):
+    store = QueueStateStore(path, lambda guild_id: queue.snapshot(), delay=0)
+    queue.next()
+    wal = path + '-wal'
+    print(f"Saved state ({len(queue)} queued):")
+    steps = (
+        ("first save", lambda: None),
+        ("checkpoint", lambda: None), # Position only
+        ("track change", queue.next),
+        ("add", lambda: queue.add(Song(make_info(0), requester))),
+        ("move(mid->0)", lambda: queue.move(len(queue) // 2, 0)),
+        ("shuffle", queue.shuffle),
+    )
+    for label, change in steps:
+        change()
+        store._db.execute("PRAGMA wal_checkpoint(TRUNCATE)") # So the WAL's size is this write alone
+        start = time.perf_counter()
+        store.mark_dirty(1)
+        store._task.cancel()
+        store._task = None
+        states = store._collect()
+        on_loop = time.perf_counter() - start
+        await asyncio.to_thread(store._write, states)
+        del states # Freeing the edits isn't part of the next step
+        written = os.path.getsize(wal)
+        print(f"  {label:<14} {on_loop * 1e3:8.2f} ms on the loop, {store.last_write_time * 1e3:8.2f} ms writing, "
+              f"{written / 1024:8.0f} KiB")
+    store.close()
+
+    # MusicCog.load_queue runs this in a worker thread.
+    store = QueueStateStore(path, lambda guild_id: None)
+    start = time.perf_counter()
+    restored = MusicQueue.restore(store.load(1))
+    print(f"  {'restore':<14} {(time.perf_counter() - start) * 1e3:8.2f} ms in a worker thread ({len(restored)} songs)")
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Spotify import against the local stubs: time to first audio, time to match
+a whole playlist, and what a repeated import costs.
+
+The fake Spotify backend (SPOTIFY_BACKEND=fake) serves --tracks tracks in
+pages of 100; StubExtractor answers each search after --search-latency
+seconds with a right match, a live version and an unrelated video.
+
+Run from the repo root:
+    python -m benchmarks.spotify_bench [--tracks 500 --search-latency 0.5]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.fakes import FakeBot, FakeContext, FakeGuild, Stats, StubExtractor, bench_environment, build_music_cog
+
+PLAYLIST = "https://open.spotify.com/playlist/37i9dQZF1DXcBWIGoYBM5M?si=bench"
+
+
+def build_cog(bot, args):
+    # Hour-long sources, so nothing leaves the queue while it is being counted.
+    cog = build_music_cog(bot, StubExtractor(latency=args.search_latency, track_seconds=180), seconds=3600)
+    cog.spotify.extractor = cog.extractor
+    return cog
+
+
+async def import_once(cog, bot, guild):
+    ctx = FakeContext(bot, guild, guild.members[0], command='play')
+    searches = cog.spotify.searches
+    start = time.perf_counter()
+    await cog.play(ctx, query=PLAYLIST)
+    first_audio = time.perf_counter() - start
+    queue = cog.get_queue(guild.id)
+    if queue.import_task:
+        await queue.import_task
+    matched = sum(1 for song in [queue.current_song, *queue.page(0, len(queue))] if song and song.video_id)
+    return {
+        'first_audio': first_audio,
+        'all_matched': time.perf_counter() - start,
+        'queued': len(queue) + 1,
+        'matched': matched,
+        'searches': cog.spotify.searches - searches,
+    }
+
+
+async def run(args):
+    bot = FakeBot(asyncio.get_running_loop())
+    stats = Stats(rest_latency=0.0)
+    guilds = [FakeGuild(stats, 40_000 + i) for i in range(2)]
+    bot.guilds = guilds
+    cog = build_cog(bot, args)
+    try:
+        first = await import_once(cog, bot, guilds[0])
+        again = await import_once(cog, bot, guilds[1]) # Same playlist, another guild: all from the mapping cache
+    finally:
+        for guild in guilds:
+            cog.get_queue(guild.id).clear()
+            if guild.voice_client:
+                await guild.voice_client.disconnect()
+        cog.cog_unload()
+    return first, again
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tracks', type=int, default=500)
+    parser.add_argument('--search-latency', type=float, default=0.5, help="seconds per YouTube search")
+    parser.add_argument('--concurrency', type=int, default=3)
+    args = parser.parse_args()
+
+    bench_environment()
+    os.environ['SPOTIFY_BACKEND'] = 'fake'
+    os.environ['SPOTIFY_FAKE_TRACKS'] = str(args.tracks)
+    os.environ['SPOTIFY_MATCH_CONCURRENCY'] = str(args.concurrency)
+
+    first, again = asyncio.run(run(args))
+    for label, result in (("First import", first), ("Repeat import", again)):
+        print(f"{label}: audio after {result['first_audio']:.2f}s, {result['matched']}/{result['queued']} matched "
+              f"after {result['all_matched']:.1f}s, {result['searches']} searches")
+    print(f"Matching everything before playing would take ~{args.tracks * args.search_latency / args.concurrency:.0f}s "
+          f"at {args.concurrency} concurrent searches")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""CPU per voice stream for the PCM path vs. Opus passthrough.
+
+Generates a local Opus/WebM test file with FFmpeg, then drains it through each
+kind of source as fast as possible, counting the bot's own CPU plus FFmpeg's
+(child) CPU. The PCM path includes the libopus encode the voice client does
+for every frame. Requires FFmpeg and libopus.
+
+Run from the repo root:  python -m benchmarks.voice_bench [--seconds 120]
+"""
+import argparse
+import os
+import resource
+import subprocess
+import tempfile
+
+import discord
+
+from utils.dsp import FilteredPCMSource, PassthroughOpusSource, FRAME_SAMPLES
+
+
+def make_test_file(path, seconds):
+    subprocess.run([
+        'ffmpeg', '-loglevel', 'error', '-y',
+        '-f', 'lavfi', '-i', f'sine=frequency=440:duration={seconds}:sample_rate=48000',
+        '-ac', '2', '-c:a', 'libopus', '-b:a', '128k', path
+    ], check=True)
+
+
+def cpu_seconds():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def drain(source, encoder=None):
+    frames = 0
+    while True:
+        data = source.read()
+        if not data:
+            break
+        if encoder is not None:
+            encoder.encode(data, FRAME_SAMPLES)
+        frames += 1
+    source.cleanup()
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=int, default=120)
+    args = parser.parse_args()
+
+    if not discord.opus.is_loaded():
+        discord.opus._load_default()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'test.webm')
+        make_test_file(path, args.seconds)
+
+        modes = {
+            'pcm (100%)': lambda: (FilteredPCMSource(discord.FFmpegPCMAudio(path)), discord.opus.Encoder()),
+            'pcm (70%)': lambda: (FilteredPCMSource(discord.FFmpegPCMAudio(path), volume=0.7), discord.opus.Encoder()),
+            'passthrough': lambda: (PassthroughOpusSource(path), None),
+        }
+        print(f"{'mode':<14} {'cpu s/audio s':>14} {'streams/core':>13}")
+        for name, build in modes.items():
+            source, encoder = build()
+            start = cpu_seconds()
+            frames = drain(source, encoder)
+            audio = frames * 0.02
+            cost = (cpu_seconds() - start) / audio if audio else float('nan')
+            print(f"{name:<14} {cost:>14.4f} {int(1 / cost) if cost else 0:>13}")
+
+
+if __name__ == '__main__':
+    main()
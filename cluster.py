@@ -0,0 +1,135 @@
+"""Cluster launcher: runs the bot as several processes, each owning a slice of
+the shards, and restarts any process that dies.
+
+    python cluster.py --clusters 4            # shard count from Discord's recommendation
+    python cluster.py --clusters 2 --shards 8
+
+Small deployments don't need this at all: `python main.py` runs every shard
+in one process.
+"""
+import argparse
+import asyncio
+import os
+import secrets
+import signal
+import sys
+import time
+
+import aiohttp
+from dotenv import load_dotenv
+
+from utils.ipc import IPCHub
+
+load_dotenv()
+
+TOKEN = os.getenv('DISCORD_TOKEN')
+
+
+async def recommended_shards():
+    async with aiohttp.ClientSession() as session:
+        async with session.get(
+            'https://discord.com/api/v10/gateway/bot',
+            headers={'Authorization': f'Bot {TOKEN}'}
+        ) as response:
+            response.raise_for_status()
+            data = await response.json()
+    return data['shards'], data['session_start_limit']['max_concurrency']
+
+
+class Cluster:
+    """One worker process and the shards it runs."""
+
+    def __init__(self, cluster_id, shard_ids, shard_count, env):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.env = env
+        self.process = None
+        self.restarts = 0
+
+    async def spawn(self):
+        env = dict(self.env,
+                   CLUSTER_ID=str(self.cluster_id),
+                   SHARD_IDS=",".join(map(str, self.shard_ids)),
+                   SHARD_COUNT=str(self.shard_count))
+        self.process = await asyncio.create_subprocess_exec(sys.executable, 'main.py', env=env)
+        print(f"[cluster {self.cluster_id}] started (pid {self.process.pid}, shards {self.shard_ids})")
+
+    async def supervise(self, stopping):
+        """Restarts the process whenever it exits, backing off if it keeps crashing."""
+        backoff = 1
+        while not stopping.is_set():
+            started = time.monotonic()
+            await self.spawn()
+            code = await self.process.wait()
+            if stopping.is_set():
+                break
+            if time.monotonic() - started > 60:
+                backoff = 1 # It ran fine for a while: this is a fresh crash
+            self.restarts += 1
+            print(f"[cluster {self.cluster_id}] exited with code {code}, restarting in {backoff}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+    def stop(self):
+        if self.process and self.process.returncode is None:
+            self.process.terminate()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clusters', type=int, default=int(os.getenv('CLUSTERS', os.cpu_count() or 1)))
+    parser.add_argument('--shards', type=int, default=int(os.getenv('SHARD_COUNT', 0)))
+    parser.add_argument('--ipc-port', type=int, default=int(os.getenv('IPC_PORT', 20000)))
+    args = parser.parse_args()
+
+    if not TOKEN or TOKEN == 'your_discord_token_here':
+        print("ERROR: DISCORD_TOKEN is missing or invalid in .env file.")
+        return
+
+    shard_count, max_concurrency = args.shards, 1
+    if not shard_count:
+        shard_count, max_concurrency = await recommended_shards()
+    clusters = max(1, min(args.clusters, shard_count))
+    print(f"Launching {shard_count} shards across {clusters} clusters")
+
+    secret = secrets.token_hex(16)
+    hub = IPCHub(args.ipc_port, secret)
+    await hub.start()
+
+    env = dict(os.environ, IPC_PORT=str(args.ipc_port), IPC_SECRET=secret)
+    workers = [
+        Cluster(i, list(range(i, shard_count, clusters)), shard_count, env)
+        for i in range(clusters)
+    ]
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stopping.set)
+        except NotImplementedError:
+            pass # Windows: Ctrl+C still raises KeyboardInterrupt
+
+    tasks = []
+    for worker in workers:
+        tasks.append(asyncio.create_task(worker.supervise(stopping)))
+        # Clusters identify their shards independently; stagger them so they
+        # don't trip Discord's identify rate limit (one per 5s per bucket).
+        await asyncio.sleep(5 * len(worker.shard_ids) / max_concurrency)
+
+    try:
+        await stopping.wait()
+    finally:
+        print("Shutting down clusters...")
+        for worker in workers:
+            worker.stop()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        hub.close()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -1,45 +1,162 @@
 import discord
 from discord.ext import commands
-import google.generativeai as genai
+import asyncio
 import os
+import time
+from collections import deque
+
+from utils.ai_backends import GeminiBackend, FakeBackend
+from utils.conversations import ConversationStore
+from utils.messages import StreamingReply, split_message
+from utils.metrics import REGISTRY
+from utils.ratelimit import RequestLimiter, QueueFull
+from utils.response_cache import ResponseCache
+
+AI_LATENCY = REGISTRY.histogram('ai_reply_seconds', "Time from !chat to the complete reply", ('source',))
+AI_FIRST_TEXT = REGISTRY.histogram('ai_first_text_seconds', "Time from !chat to the first visible text")
+
+PERSONA = "You are Antigravity, a chaotic, funny, and slightly unhinged Discord bot. Your purpose is to entertain. Answer user queries with humor and chaos."
+
+def render_reply(text):
+    """Terminal-style text block, unless the model wrote code blocks of its own."""
+    if "```" in text:
+        return split_message(text)
+    return split_message(f"```text\n{text}\n```")
 
 class AICog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.backend = self._create_backend()
+        self.limiter = RequestLimiter(
+            rate=float(os.getenv('AI_RATE', 1.0)), # requests per second
+            burst=int(os.getenv('AI_BURST', 5)),
+            concurrency=int(os.getenv('AI_CONCURRENCY', 4)),
+            max_waiting=int(os.getenv('AI_MAX_WAITING', 20))
+        )
+        self.timeout = float(os.getenv('AI_TIMEOUT', 60))
+        # Conversation memory per channel (or 'user' / 'guild'), instead of one global chat.
+        self.conversations = ConversationStore(
+            scope=os.getenv('AI_MEMORY_SCOPE', 'channel'),
+            token_budget=int(os.getenv('AI_CONTEXT_TOKENS', 2000)),
+            max_sessions=int(os.getenv('AI_MAX_SESSIONS', 1000)),
+            ttl=int(os.getenv('AI_SESSION_TTL', 3600)),
+            max_total_tokens=int(os.getenv('AI_MAX_TOTAL_TOKENS', 500000))
+        )
+        self.response_cache = ResponseCache(
+            max_entries=int(os.getenv('AI_CACHE_SIZE', 500)),
+            ttl=int(os.getenv('AI_CACHE_TTL', 3600))
+        )
+        self.edit_interval = float(os.getenv('AI_EDIT_INTERVAL', 1.2))
+        self.ttfb = deque(maxlen=200) # seconds from command to first visible text
+
+    def _create_backend(self):
+        if os.getenv('AI_BACKEND') == 'fake':
+            print("AI Cog: using the fake model backend.")
+            return FakeBackend(latency=float(os.getenv('AI_FAKE_LATENCY', 1.0)))
+
         # Configure Gemini
         api_key = os.getenv('GEMINI_API_KEY')
         if api_key and api_key != 'your_gemini_api_key_here':
-            genai.configure(api_key=api_key)
             # gemini-pro is deprecated/unavailable in some contexts. using gemini-1.5-flash.
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
-            self.chat_session = self.model.start_chat(history=[])
-            print("AI Cog: Gemini configured successfully.")
-        else:
-            self.model = None
-            print("AI Cog: WARNING - GEMINI_API_KEY not found or invalid.")
+            backend = GeminiBackend(api_key, 'gemini-1.5-flash', system_instruction=PERSONA)
+            print("AI Cog: Gemini configured (model loads on first use).")
+            return backend
+        print("AI Cog: WARNING - GEMINI_API_KEY not found or invalid.")
+        return None
 
     @commands.command(name="chat", aliases=["ask"])
     async def chat(self, ctx, *, query: str):
         """Talk to the Antigravity Brain."""
-        if not self.model:
+        if not self.backend:
             await ctx.send("My brain is missing! (Check GEMINI_API_KEY in .env)")
             return
 
         async with ctx.typing():
             try:
-                # Add personality prompt
-                prompt = f"You are Antigravity, a chaotic, funny, and slightly unhinged Discord bot. Your purpose is to entertain. Answer the following user query with humor and chaos: {query}"
-                
-                response = self.chat_session.send_message(prompt)
-                
-                # Discord has a 2000 char limit. Reserve space for code block.
-                response_text = response.text
-                if len(response_text) > 1990:
-                    response_text = response_text[:1985] + "..."
-                
-                await ctx.send(f"```text\n{response_text}\n```")
+                started = time.monotonic()
+                key = self.conversations.key_for(ctx)
+                conversation = self.conversations.get(key)
+                reply = StreamingReply(ctx, render=render_reply, interval=self.edit_interval)
+
+                # Openers of a fresh conversation carry no context, and they repeat a lot.
+                cacheable = not conversation.turns and not conversation.summary
+                response_text = self.response_cache.get(query) if cacheable else None
+                if response_text is not None:
+                    self.ttfb.append(time.monotonic() - started)
+                    AI_FIRST_TEXT.observe(self.ttfb[-1])
+                    AI_LATENCY.observe(self.ttfb[-1], source='cache')
+                else:
+                    history, prompt = conversation.history(), conversation.prompt(query)
+                    async with self.limiter.slot():
+                        response_text = await asyncio.wait_for(
+                            self._stream(reply, history, prompt, started), timeout=self.timeout
+                        )
+                    AI_LATENCY.observe(time.monotonic() - started, source='model')
+                    if cacheable:
+                        self.response_cache.put(query, response_text)
+
+                # Long answers continue in follow-up messages instead of being cut off.
+                await reply.update(response_text, final=True)
+                self.conversations.record(key, query, response_text)
+            except QueueFull:
+                await ctx.send("```text\nMy brain is at full capacity right now. Try again in a moment. 🧠🔥\n```")
+            except asyncio.TimeoutError:
+                await ctx.send("```text\nError: My brain timed out. The cosmos is lagging.\n```")
             except Exception as e:
                 await ctx.send(f"```text\nError: I tripped over a cosmic ray. ({e})\n```")
 
+    async def _stream(self, reply, history, prompt, started):
+        """Streams the model's reply into `reply` and returns the full text."""
+        text = ""
+        async for chunk in self.backend.stream(history, prompt):
+            if not text:
+                self.ttfb.append(time.monotonic() - started)
+                AI_FIRST_TEXT.observe(self.ttfb[-1])
+            text += chunk
+            await reply.update(text)
+        return text
+
+    @commands.command(name="aistats")
+    async def aistats(self, ctx):
+        """Shows the AI request queue."""
+        stats = self.limiter.stats()
+        await ctx.send(
+            "```text\n"
+            f"AI calls: {stats['active']}/{stats['concurrency']} running, {stats['waiting']}/{stats['max_waiting']} waiting\n"
+            f"Served: {stats['served']} | Turned away (busy): {stats['rejected']}\n"
+            + self._memory_summary()
+            + self._latency_summary() +
+            "```"
+        )
+
+    def _latency_summary(self):
+        cache = self.response_cache.stats()
+        line = (
+            f"Response cache: {cache['entries']} entries, {cache['hits']} hits, "
+            f"{cache['misses']} misses ({cache['hit_rate']:.1%})\n"
+        )
+        if self.ttfb:
+            samples = sorted(self.ttfb)
+            p50 = samples[len(samples) // 2]
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+            line += f"Time to first text: p50 {p50:.2f}s, p95 {p95:.2f}s (last {len(samples)})\n"
+        return line
+
+    def _memory_summary(self):
+        stats = self.conversations.stats()
+        return (
+            f"Conversations ({self.conversations.scope}): {stats['sessions']} live, "
+            f"{stats['total_tokens']} tokens total (avg {stats['avg_tokens']:.0f}, max {stats['max_tokens']}), "
+            f"{stats['evicted']} evicted\n"
+        )
+
+    @commands.command(name="amnesia", aliases=["resetchat"])
+    async def amnesia(self, ctx):
+        """Makes the bot forget this conversation."""
+        if self.conversations.forget(self.conversations.key_for(ctx)):
+            await ctx.send("```text\nWho are you people? Where am I? 🌀\n```")
+        else:
+            await ctx.send("```text\nThere was nothing to forget. Suspicious.\n```")
+
 async def setup(bot):
     await bot.add_cog(AICog(bot))
@@ -1,11 +1,78 @@
 import discord
 from discord.ext import commands
+import os
 import random
 
+from utils.automod import ActionBatcher, AutoMod, Blocklist
+from utils.ratelimit import TokenBucket
+
 class ModerationCog(commands.Cog):
+    # Members are not chunked at startup (see CACHE_PROFILE in main.py). The
+    # discord.Member converter falls back to a targeted gateway member query when
+    # someone isn't cached, so only the member being moderated is fetched.
     def __init__(self, bot):
         self.bot = bot
 
+        # Auto-moderation: runs on every guild message, so the checks are a regex scan
+        # and two ring-buffer counters; everything that costs a REST call is batched.
+        self.automod_enabled = os.getenv('AUTOMOD', '1') != '0'
+        self.automod = AutoMod(
+            Blocklist.from_file(os.getenv('AUTOMOD_BLOCKLIST', 'data/blocklist.txt')),
+            window=float(os.getenv('AUTOMOD_WINDOW', 10)),
+            user_limit=int(os.getenv('AUTOMOD_USER_LIMIT', 8)),
+            channel_limit=int(os.getenv('AUTOMOD_CHANNEL_LIMIT', 40)),
+            raid_user_limit=int(os.getenv('AUTOMOD_RAID_USER_LIMIT', 4)),
+            raid_seconds=float(os.getenv('AUTOMOD_RAID_SECONDS', 300)),
+            new_member_age=float(os.getenv('AUTOMOD_NEW_MEMBER', 600)), # joined this recently + raid = kick
+            max_keys=int(os.getenv('AUTOMOD_MAX_KEYS', 100_000))
+        )
+        self.automod_actions = ActionBatcher(
+            TokenBucket(float(os.getenv('AUTOMOD_RATE', 5)), int(os.getenv('AUTOMOD_BURST', 10))),
+            interval=float(os.getenv('AUTOMOD_BATCH_SECONDS', 1)),
+            timeout=float(os.getenv('AUTOMOD_TIMEOUT', 600))
+        )
+
+    def cog_unload(self):
+        self.automod_actions.close()
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        if not self.automod_enabled or message.guild is None or message.author.bot:
+            return
+        author = message.author
+        joined_at = author.joined_at.timestamp() if getattr(author, 'joined_at', None) else None
+        verdict = self.automod.check(message.guild.id, message.channel.id, author.id, message.content, joined_at)
+        if verdict is None:
+            return
+        # Resolving permissions walks the member's roles, so only flagged messages pay for it.
+        permissions = getattr(author, 'guild_permissions', None)
+        if permissions is not None and permissions.manage_messages:
+            return
+        self.automod_actions.add(message, verdict)
+
+    @commands.command(name="automod")
+    @commands.has_permissions(manage_guild=True)
+    async def automod_stats(self, ctx):
+        """Shows what auto-moderation has been doing."""
+        self.automod.prune()
+        stats = self.automod.stats()
+        verdicts = ", ".join(f"{count} {action}" for action, count in sorted(stats['verdicts'].items())) or "none"
+        raid = " (RAID MODE here)" if self.automod.in_raid(ctx.guild.id) else ""
+        await ctx.send(
+            "```text\n"
+            f"AutoMod: {'on' if self.automod_enabled else 'off'}{raid} | {stats['blocklist']} blocked terms\n"
+            f"Checked: {stats['checked']} messages | Verdicts: {verdicts}\n"
+            f"Raids: {stats['raids']} detected, {stats['active_raids']} active\n"
+            f"Tracking {stats['tracked_users']} users, {stats['tracked_channels']} channels "
+            f"({stats['evicted']} evicted) | {self.automod_actions.calls} REST actions, {self.automod_actions.pending()} pending\n"
+            "```"
+        )
+
+    @automod_stats.error
+    async def automod_stats_error(self, ctx, error):
+        if isinstance(error, commands.MissingPermissions):
+            await ctx.send("```text\nYou need Manage Server to see that.\n```")
+
     @commands.command(name="yeet")
     @commands.has_permissions(kick_members=True)
     async def yeet(self, ctx, member: discord.Member, *, reason=None):
@@ -30,6 +97,8 @@ class ModerationCog(commands.Cog):
     async def yeet_error(self, ctx, error):
         if isinstance(error, commands.MissingPermissions):
             await ctx.send("```text\nYou don't have the power to yeet people!\n```")
+        elif isinstance(error, commands.MemberNotFound):
+            await ctx.send(f"```text\nCouldn't find '{error.argument}' in this server.\n```")
 
     @commands.command(name="silence")
     @commands.has_permissions(move_members=True)
@@ -44,5 +113,12 @@ class ModerationCog(commands.Cog):
         else:
             await ctx.send(f"```text\n{member.name} is not in a voice channel.\n```")
 
+    @silence.error
+    async def silence_error(self, ctx, error):
+        if isinstance(error, commands.MissingPermissions):
+            await ctx.send("```text\nYou don't have the power to silence people!\n```")
+        elif isinstance(error, commands.MemberNotFound):
+            await ctx.send(f"```text\nCouldn't find '{error.argument}' in this server.\n```")
+
 async def setup(bot):
     await bot.add_cog(ModerationCog(bot))
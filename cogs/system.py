@@ -0,0 +1,195 @@
+from discord.ext import commands, tasks
+import asyncio
+import os
+import time
+
+from utils.cache_profile import cache_bytes, cache_counts, live_objects
+from utils.metrics import REGISTRY
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+def rss_mb():
+    """Resident memory of this process in MiB (peak RSS where the current value isn't available)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1048576
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return 0.0
+
+class SystemCog(commands.Cog):
+    """Bot maintenance commands."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.memstats_interval = float(os.getenv('MEMSTATS_INTERVAL', 30)) # minutes, 0 disables
+
+    async def cog_load(self):
+        self.bot.ipc.register('stats', self.local_stats)
+        if self.memstats_interval > 0:
+            self.memory_report.change_interval(minutes=self.memstats_interval)
+            self.memory_report.start()
+
+    async def cog_unload(self):
+        self.memory_report.cancel()
+
+    def memory_summary(self):
+        """One line of RSS plus gateway cache sizes, for logs."""
+        counts = cache_counts(self.bot)
+        sizes = cache_bytes(self.bot)
+        cached = ", ".join(
+            f"{name} {count}" + (f" (~{sizes[name] / 1048576:.1f} MiB)" if name in sizes else "")
+            for name, count in counts.items()
+        )
+        return f"RSS {rss_mb():.1f} MiB | cache {getattr(self.bot, 'cache_profile', '?')}: {cached}"
+
+    @tasks.loop(minutes=30)
+    async def memory_report(self):
+        print(f"[memstats] {self.memory_summary()}")
+
+    @memory_report.before_loop
+    async def before_memory_report(self):
+        await self.bot.wait_until_ready()
+
+    async def local_stats(self):
+        """This process's share of the cluster-wide numbers."""
+        latency = self.bot.latency
+        return {
+            'shards': sorted(self.bot.shards) if hasattr(self.bot, 'shards') else [0],
+            'guilds': len(self.bot.guilds),
+            'users': len(self.bot.users),
+            'voice': len(self.bot.voice_clients),
+            'latency_ms': round(latency * 1000) if latency == latency else None, # NaN before connect
+            'rss_mb': round(rss_mb(), 1),
+        }
+
+    @commands.command(name="clusterstats", aliases=["shards"])
+    async def clusterstats(self, ctx):
+        """Collects stats from every cluster process."""
+        results = await self.bot.ipc.broadcast('stats')
+        lines = []
+        totals = {'guilds': 0, 'users': 0, 'voice': 0, 'rss_mb': 0.0}
+        for cluster_id, stats in sorted(results.items()):
+            if not stats or 'error' in stats:
+                lines.append(f"Cluster {cluster_id}: no answer")
+                continue
+            for key in totals:
+                totals[key] += stats[key]
+            lines.append(
+                f"Cluster {cluster_id} shards {stats['shards']}: {stats['guilds']} guilds, "
+                f"{stats['voice']} voice, {stats['latency_ms']}ms, {stats['rss_mb']} MiB"
+            )
+        lines.append(
+            f"Total: {len(results)} clusters, {totals['guilds']} guilds, {totals['users']} users, "
+            f"{totals['voice']} voice, {totals['rss_mb']:.0f} MiB"
+        )
+        await ctx.send("```text\n" + "\n".join(lines) + "\n```")
+
+    @commands.command(name="memstats")
+    async def memstats(self, ctx):
+        """Shows resident memory and what the gateway cache is holding."""
+        counts = cache_counts(self.bot)
+        sizes = cache_bytes(self.bot)
+        # A full gc walk touches every object; keep it off the event loop.
+        objects = await asyncio.to_thread(live_objects)
+        lines = [
+            f"RSS: {rss_mb():.1f} MiB | cache profile: {getattr(self.bot, 'cache_profile', '?')}",
+            f"Message cache limit: {self.bot._connection.max_messages}",
+            "",
+            "Cached:",
+        ]
+        for name, count in counts.items():
+            size = f" ~{sizes[name] / 1048576:.2f} MiB" if name in sizes else ""
+            lines.append(f"  {name:<13}{count:>9}{size}")
+        lines.append("")
+        lines.append("Live discord.py objects (top 8):")
+        for name, count in list(objects.items())[:8]:
+            lines.append(f"  {name:<22}{count:>9}")
+        await ctx.send("```text\n" + "\n".join(lines) + "\n```")
+
+    @commands.command(name="perf")
+    async def perf(self, ctx):
+        """Latency breakdown: commands, event loop, REST, yt-dlp, AI and voice."""
+        metrics = REGISTRY.metrics
+        ms = lambda seconds: f"{seconds * 1000:.0f}ms"
+        lines = []
+
+        lag = metrics.get('event_loop_lag_seconds')
+        if lag and lag.count():
+            lines.append(f"Event loop lag: last {ms(self.bot.loop_lag.last)}, p99 {ms(lag.quantile(0.99))}")
+
+        commands_hist = metrics.get('command_seconds')
+        if commands_hist and commands_hist.count():
+            lines.append("Commands (count, p50, p99):")
+            busiest = sorted(commands_hist.label_values('command'), key=lambda c: -commands_hist.count(command=c))
+            for name in busiest[:8]:
+                lines.append(
+                    f"  !{name:<14}{commands_hist.count(command=name):>6}  {ms(commands_hist.quantile(0.5, command=name)):>7}"
+                    f"  {ms(commands_hist.quantile(0.99, command=name)):>7}"
+                )
+            for cog in commands_hist.label_values('cog'):
+                lines.append(
+                    f"  [{cog}] {commands_hist.count(cog=cog)} calls, p50 {ms(commands_hist.quantile(0.5, cog=cog))}, "
+                    f"p99 {ms(commands_hist.quantile(0.99, cog=cog))}, errors {commands_hist.count(cog=cog, status='error')}"
+                )
+
+        for name, label in (('rest_seconds', "Discord REST"), ('extraction_seconds', "yt-dlp"),
+                            ('ai_reply_seconds', "AI replies"), ('ai_first_text_seconds', "AI first text")):
+            hist = metrics.get(name)
+            if hist and hist.count():
+                lines.append(f"{label}: {hist.count()} calls, p50 {ms(hist.quantile(0.5))}, p99 {ms(hist.quantile(0.99))}")
+
+        for name, label in (('extractions_total', "Extractions"), ('ffmpeg_spawns_total', "FFmpeg spawns")):
+            counter = metrics.get(name)
+            if counter and counter.values:
+                parts = ", ".join(f"{'/'.join(key)} {value}" for key, value in sorted(counter.values.items()))
+                lines.append(f"{label}: {parts}")
+
+        jitter = metrics.get('voice_frame_jitter_seconds')
+        if jitter and jitter.count():
+            worst = max(jitter.label_values('guild'), key=lambda g: jitter.quantile(0.99, guild=g))
+            lines.append(
+                f"Voice jitter: p99 {ms(jitter.quantile(0.99))} over {len(jitter.series)} guilds, "
+                f"worst guild {worst} p99 {ms(jitter.quantile(0.99, guild=worst))}"
+            )
+
+        await ctx.send("```text\n" + ("\n".join(lines) or "No measurements yet.") + "\n```")
+
+    @commands.command(name="reload")
+    @commands.is_owner()
+    async def reload(self, ctx, cog: str = None):
+        """Hot-reloads one cog (or all of them) without restarting the bot.
+
+        The music cog is skipped while the bot is in a voice channel: its voice
+        clients' callbacks belong to the old cog, so playback would stop.
+        """
+        names = [f'cogs.{cog.lower()}'] if cog else sorted(self.bot.extensions)
+        lines = []
+        for name in names:
+            start = time.perf_counter()
+            if name == 'cogs.music' and name in self.bot.extensions and self.bot.voice_clients:
+                lines.append(f"{name}: skipped, {len(self.bot.voice_clients)} voice connection(s) active")
+                continue
+            try:
+                if name in self.bot.extensions:
+                    await self.bot.reload_extension(name)
+                else:
+                    await self.bot.load_extension(name)
+                lines.append(f"{name}: reloaded in {time.perf_counter() - start:.2f}s")
+            except Exception as e:
+                lines.append(f"{name}: FAILED ({e})")
+        print("\n".join(lines))
+        await ctx.send("```text\n" + "\n".join(lines) + "\n```")
+
+    @reload.error
+    async def reload_error(self, ctx, error):
+        if isinstance(error, commands.NotOwner):
+            await ctx.send("```text\nOnly my creator may rewire my brain.\n```")
+
+async def setup(bot):
+    await bot.add_cog(SystemCog(bot))
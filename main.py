@@ -1,18 +1,42 @@
+import time
+STARTED = time.perf_counter()
+
 import discord
 from discord.ext import commands
+import asyncio
+import importlib
 import os
 from dotenv import load_dotenv
 
+from utils.cache_profile import cache_options
+from utils.ipc import IPCClient, LocalIPC
+from utils.metrics import REGISTRY, LoopLagMonitor, MetricsServer
+
 # Load environment variables
 load_dotenv()
 
 # Configuration
 TOKEN = os.getenv('DISCORD_TOKEN')
+COLD_START_TARGET = float(os.getenv('COLD_START_TARGET', 10)) # seconds from launch to ready
+
+# Cluster mode (set by cluster.py). Without these the bot runs every shard in this process.
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', 0)) or None
+SHARD_IDS = [int(i) for i in os.getenv('SHARD_IDS', '').split(',') if i] or None
+CLUSTER_ID = int(os.getenv('CLUSTER_ID', 0))
+
+# Metrics endpoint: clusters listen on METRICS_PORT + cluster id. Unset or 0 disables it.
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+
+COMMAND_LATENCY = REGISTRY.histogram('command_seconds', "Command latency", ('command', 'cog', 'status'))
+REST_LATENCY = REGISTRY.histogram('rest_seconds', "Discord REST request latency", ('method', 'route', 'status'))
+
+# Gateway cache: full, lean or minimal (see utils/cache_profile.py)
+CACHE_PROFILE = os.getenv('CACHE_PROFILE', 'lean')
 
 # Bot Setup
 intents = discord.Intents.default()
 intents.message_content = True
-intents.members = True # Required for moderation (kick/ban)
+intents.members = True # Required for moderation (kick/ban); members are cached per CACHE_PROFILE
 
 class TerminalHelpCommand(commands.DefaultHelpCommand):
     """Custom help command to match the terminal aesthetic."""
@@ -22,32 +46,112 @@ class TerminalHelpCommand(commands.DefaultHelpCommand):
             # Wrap the help output in a code block
             await destination.send(f"```text\n{page}\n```")
 
-class AntigravityBot(commands.Bot):
+class AntigravityBot(commands.AutoShardedBot):
     def __init__(self):
         super().__init__(
             command_prefix='!',
             intents=intents,
             help_command=TerminalHelpCommand(),
-            case_insensitive=True
+            case_insensitive=True,
+            shard_count=SHARD_COUNT,
+            shard_ids=SHARD_IDS,
+            **cache_options(CACHE_PROFILE)
+        )
+        self.cache_profile = CACHE_PROFILE
+        self.cold_start = None
+        self.cluster_id = CLUSTER_ID
+        if os.getenv('IPC_PORT'):
+            self.ipc = IPCClient(CLUSTER_ID, int(os.getenv('IPC_PORT')), os.getenv('IPC_SECRET'))
+        else:
+            self.ipc = LocalIPC()
+        self.loop_lag = LoopLagMonitor()
+        self.metrics_server = MetricsServer(port=METRICS_PORT + CLUSTER_ID) if METRICS_PORT else None
+        self.before_invoke(self.start_timer)
+        self.after_invoke(self.record_latency)
+        self._instrument_http()
+
+    async def start_timer(self, ctx):
+        ctx.started_at = time.perf_counter()
+
+    async def record_latency(self, ctx):
+        """Runs after every command, whether it succeeded or raised."""
+        started = getattr(ctx, 'started_at', None)
+        if started is None:
+            return
+        COMMAND_LATENCY.observe(
+            time.perf_counter() - started,
+            command=ctx.command.qualified_name,
+            cog=ctx.cog.qualified_name if ctx.cog else 'none',
+            status='error' if ctx.command_failed else 'ok'
         )
 
+    def _instrument_http(self):
+        """Times every REST call discord.py makes, labelled by route template."""
+        request = self.http.request
+
+        async def timed_request(route, **kwargs):
+            start = time.perf_counter()
+            status = 'error'
+            try:
+                response = await request(route, **kwargs)
+                status = 'ok'
+                return response
+            except discord.HTTPException as e:
+                status = str(e.status)
+                raise
+            finally:
+                REST_LATENCY.observe(time.perf_counter() - start, method=route.method, route=route.path, status=status)
+
+        self.http.request = timed_request
+
     async def setup_hook(self):
-        """Loads all cogs from the cogs directory."""
+        """Loads all cogs from the cogs directory, concurrently."""
+        await self.ipc.start()
+        self.loop_lag.start()
+        if self.metrics_server:
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                print(f"Metrics: could not listen on port {self.metrics_server.port}: {e}")
         print("--- Loading Cogs ---")
-        for filename in os.listdir('./cogs'):
-            if filename.endswith('.py') and filename != '__init__.py':
-                try:
-                    await self.load_extension(f'cogs.{filename[:-3]}')
-                    print(f'Loaded: {filename}')
-                except Exception as e:
-                    print(f'Failed to load {filename}: {e}')
-        print("--- Cogs Loaded ---")
+        start = time.perf_counter()
+        names = [
+            f'cogs.{filename[:-3]}' for filename in sorted(os.listdir('./cogs'))
+            if filename.endswith('.py') and filename != '__init__.py'
+        ]
+        await asyncio.gather(*(self.load_cog(name) for name in names))
+        print(f"--- Cogs Loaded in {time.perf_counter() - start:.2f}s ---")
+
+    async def load_cog(self, name):
+        """Loads one cog, logging import and setup time separately."""
+        start = time.perf_counter()
+        try:
+            # Import in a worker thread first so cogs import in parallel; load_extension
+            # then re-runs only the cog module itself, with its dependencies already cached.
+            await asyncio.to_thread(importlib.import_module, name)
+            imported = time.perf_counter()
+            await self.load_extension(name)
+            print(f'Loaded: {name} (import {imported - start:.2f}s, setup {time.perf_counter() - imported:.2f}s)')
+        except Exception as e:
+            print(f'Failed to load {name}: {e}')
 
     async def on_ready(self):
-        print(f'Logged in as {self.user} (ID: {self.user.id})')
+        if self.cold_start is None:
+            self.cold_start = time.perf_counter() - STARTED
+            print(f'Cold start: {self.cold_start:.2f}s (target {COLD_START_TARGET:g}s)')
+            if self.cold_start > COLD_START_TARGET:
+                print('WARNING: cold start exceeded COLD_START_TARGET.')
+        print(f'Logged in as {self.user} (ID: {self.user.id}) | cluster {self.cluster_id}, shards {sorted(self.shards)}, cache {self.cache_profile}')
         print('Antigravity is ready to defy physics (and logic).')
         await self.change_presence(activity=discord.Game(name="Defying Physics | !help"))
 
+    async def close(self):
+        self.ipc.close()
+        self.loop_lag.stop()
+        if self.metrics_server:
+            self.metrics_server.close()
+        await super().close()
+
 # Run the Bot
 if __name__ == '__main__':
     if not TOKEN or TOKEN == 'your_discord_token_here':
@@ -0,0 +1,73 @@
+import asyncio
+import random
+
+
+class GeminiBackend:
+    """Google Gemini through the library's native async API. Stateless: the
+    caller passes the conversation history it wants the model to see.
+
+    The (slow to import) client library and model are only set up on first
+    use, in a worker thread, so they cost nothing at startup.
+    """
+
+    def __init__(self, api_key, model_name='gemini-1.5-flash', system_instruction=None):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.model = None
+        self._loading = None
+
+    def _create_model(self):
+        import google.generativeai as genai
+        genai.configure(api_key=self.api_key)
+        return genai.GenerativeModel(self.model_name, system_instruction=self.system_instruction)
+
+    async def _get_model(self):
+        if self.model is None:
+            if self._loading is None:
+                self._loading = asyncio.ensure_future(asyncio.to_thread(self._create_model))
+            try:
+                self.model = await asyncio.shield(self._loading)
+            except Exception:
+                self._loading = None # Let the next call retry
+                raise
+        return self.model
+
+    async def send(self, history, prompt):
+        model = await self._get_model()
+        contents = history + [{'role': 'user', 'parts': [prompt]}]
+        response = await model.generate_content_async(contents)
+        return response.text
+
+    async def stream(self, history, prompt):
+        """Yields the reply in chunks as Gemini generates it."""
+        model = await self._get_model()
+        contents = history + [{'role': 'user', 'parts': [prompt]}]
+        response = await model.generate_content_async(contents, stream=True)
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+
+class FakeBackend:
+    """Local stand-in model that just simulates latency. Use it (AI_BACKEND=fake)
+    to test the chat path and load-test the limiter without an API key."""
+
+    def __init__(self, latency=1.0, jitter=0.5, per_turn=0.02, per_word=0.01):
+        self.latency = latency
+        self.jitter = jitter
+        self.per_turn = per_turn # extra latency per history turn, like a real model's prefill
+        self.per_word = per_word # generation time per streamed word
+
+    def _reply(self, prompt):
+        return f"[fake model] You said: {prompt[-200:]}"
+
+    async def send(self, history, prompt):
+        await asyncio.sleep(self.latency + len(history) * self.per_turn + random.uniform(0, self.jitter))
+        return self._reply(prompt)
+
+    async def stream(self, history, prompt):
+        await asyncio.sleep(self.latency + len(history) * self.per_turn + random.uniform(0, self.jitter))
+        for word in self._reply(prompt).split(' '):
+            yield word + ' '
+            await asyncio.sleep(self.per_word)
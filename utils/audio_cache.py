@@ -0,0 +1,206 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AudioCache:
+    """Size-capped on-disk cache of popular tracks' audio, keyed by video ID.
+
+    Plays are counted per video; once a track has been played `hot_after`
+    times it is downloaded in the background on a small, rate-limited pool so
+    caching never competes with live playback for bandwidth. Files are
+    checksummed when stored, size-checked on every lookup, fully re-verified
+    once at startup, and evicted least-recently-used beyond `max_bytes`.
+
+    Cluster processes can share the directory: each downloads into its own
+    incoming directory, and only cluster 0 re-verifies the files at startup.
+    """
+
+    def __init__(self, directory, max_bytes, hot_after=3, workers=1, rate_limit=None, max_duration=15 * 60,
+                 cluster_id=0):
+        self.directory = directory
+        self.incoming = os.path.join(directory, f'incoming-{cluster_id}')
+        self.max_bytes = max_bytes
+        self.hot_after = hot_after
+        self.rate_limit = rate_limit # bytes per second, per download
+        self.max_duration = max_duration
+        self._lock = threading.Lock()
+        self._downloading = set()
+        self.hits = 0
+        self.misses = 0
+        self.downloads = 0
+        self.evictions = 0
+        self.corrupt = 0
+
+        # Partial downloads from this process's previous run; other clusters' are left alone.
+        shutil.rmtree(self.incoming, ignore_errors=True)
+        os.makedirs(self.incoming, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, 'index.db'), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "video_id TEXT PRIMARY KEY, filename TEXT NOT NULL, acodec TEXT, "
+            "size INTEGER NOT NULL, sha256 TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS plays ("
+            "video_id TEXT PRIMARY KEY, count INTEGER NOT NULL, last_played REAL NOT NULL)"
+        )
+        self._db.commit()
+
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='audio-cache')
+        if cluster_id == 0:
+            self.executor.submit(self.scrub)
+
+    # --- Lookups ---
+
+    def lookup(self, video_id):
+        """Returns (path, acodec) of a verified cached copy, or None."""
+        if not video_id:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT filename, acodec, size FROM files WHERE video_id = ?", (video_id,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            path = os.path.join(self.directory, row[0])
+            try:
+                intact = os.path.getsize(path) == row[2]
+            except OSError:
+                intact = False
+            if not intact:
+                self.corrupt += 1
+                self.misses += 1
+                self._drop(video_id, row[0])
+                return None
+            self._db.execute("UPDATE files SET last_used = ? WHERE video_id = ?", (time.time(), video_id))
+            self._db.commit()
+            self.hits += 1
+            return path, row[1]
+
+    def record_play(self, video_id, web_url, duration=None):
+        """Counts a play and starts a background download once the track is hot."""
+        if not video_id or not web_url or (duration and duration > self.max_duration):
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO plays (video_id, count, last_played) VALUES (?, 1, ?) "
+                "ON CONFLICT(video_id) DO UPDATE SET count = count + 1, last_played = excluded.last_played",
+                (video_id, time.time())
+            )
+            self._db.commit()
+            count = self._db.execute("SELECT count FROM plays WHERE video_id = ?", (video_id,)).fetchone()[0]
+            cached = self._db.execute("SELECT 1 FROM files WHERE video_id = ?", (video_id,)).fetchone()
+            if count < self.hot_after or cached or video_id in self._downloading:
+                return
+            self._downloading.add(video_id)
+        self.executor.submit(self._download, video_id, web_url)
+
+    # --- Background work ---
+
+    def _download(self, video_id, web_url):
+        import yt_dlp # Deferred to the first download, off the startup path
+        options = {
+            'format': 'bestaudio[acodec=opus]/bestaudio',
+            'outtmpl': os.path.join(self.incoming, f'{video_id}.%(ext)s'),
+            'noplaylist': True,
+            'quiet': True,
+            'no_warnings': True,
+        }
+        if self.rate_limit:
+            options['ratelimit'] = self.rate_limit
+        try:
+            with yt_dlp.YoutubeDL(options) as ytdl:
+                info = ytdl.extract_info(web_url, download=True)
+                temp_path = ytdl.prepare_filename(info)
+            filename = os.path.basename(temp_path)
+            size = os.path.getsize(temp_path)
+            checksum = _sha256(temp_path)
+            os.replace(temp_path, os.path.join(self.directory, filename))
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO files (video_id, filename, acodec, size, sha256, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (video_id, filename, info.get('acodec'), size, checksum, time.time())
+                )
+                self._db.commit()
+                self.downloads += 1
+                self._evict()
+        except Exception as e:
+            print(f"Audio cache: download of {video_id} failed: {e}")
+        finally:
+            with self._lock:
+                self._downloading.discard(video_id)
+
+    def scrub(self):
+        """Re-hashes every cached file, dropping any that no longer match."""
+        with self._lock:
+            rows = self._db.execute("SELECT video_id, filename, size, sha256 FROM files").fetchall()
+        for video_id, filename, size, checksum in rows:
+            path = os.path.join(self.directory, filename)
+            try:
+                intact = os.path.getsize(path) == size and _sha256(path) == checksum
+            except OSError:
+                intact = False
+            if not intact:
+                with self._lock:
+                    self.corrupt += 1
+                    self._drop(video_id, filename)
+
+    # --- Bookkeeping (callers hold the lock) ---
+
+    def _drop(self, video_id, filename):
+        self._db.execute("DELETE FROM files WHERE video_id = ?", (video_id,))
+        self._db.commit()
+        try:
+            os.remove(os.path.join(self.directory, filename))
+        except OSError:
+            pass
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM files").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for video_id, filename, size in self._db.execute(
+            "SELECT video_id, filename, size FROM files ORDER BY last_used"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._drop(video_id, filename)
+            total -= size
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM files").fetchone()
+        return {
+            'files': count,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'downloads': self.downloads,
+            'downloading': len(self._downloading),
+            'evictions': self.evictions,
+            'corrupt': self.corrupt,
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            self._db.close()
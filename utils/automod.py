@@ -0,0 +1,273 @@
+import asyncio
+import datetime
+import os
+import re
+import time
+from array import array
+from collections import OrderedDict, defaultdict, namedtuple
+
+import discord
+
+from utils.metrics import REGISTRY
+
+AUTOMOD_ACTIONS = REGISTRY.counter('automod_actions_total', "Auto-moderation REST actions", ('action', 'result'))
+
+Verdict = namedtuple('Verdict', 'action reason') # action: 'delete', 'timeout' or 'kick'
+
+
+def trie_regex(words):
+    """One alternation for many words, shaped like their prefix trie
+    ('cat', 'car' -> 'ca(?:r|t)'), so the regex engine never re-reads a shared
+    prefix. It gives most of Aho-Corasick's benefit while the scan stays in C."""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True # End of a word
+
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        alternation = '|'.join(branches)
+        if '' in node:
+            return f'(?:{alternation})?'
+        return alternation if len(branches) == 1 else f'(?:{alternation})'
+
+    return emit(trie)
+
+
+class Blocklist:
+    """Case-insensitive whole-word matcher for a list of terms (which may contain
+    spaces or punctuation, e.g. invite links)."""
+
+    def __init__(self, words=()):
+        self.words = sorted({word.strip().lower() for word in words if word.strip()})
+        self.pattern = re.compile(rf'(?<!\w)(?:{trie_regex(self.words)})(?!\w)', re.IGNORECASE) if self.words else None
+
+    @classmethod
+    def from_file(cls, path):
+        """One term per line; blank lines and '#' comments are skipped. A missing file is an empty list."""
+        if not path or not os.path.exists(path):
+            return cls()
+        with open(path, encoding='utf-8') as f:
+            return cls(line for line in f if not line.lstrip().startswith('#'))
+
+    def search(self, text):
+        """The first blocked term in `text`, or None."""
+        if self.pattern is None or not text:
+            return None
+        match = self.pattern.search(text)
+        return match.group(0) if match else None
+
+    def __len__(self):
+        return len(self.words)
+
+
+class SlidingWindow:
+    """Per-key event counts over the last `window` seconds.
+
+    Each key is one compact array: the tick it was last written at, then a
+    ring of `slots` counters. Slots the ring skipped over are zeroed when it is
+    next written, so a hit costs O(slots) at worst. Keys live in an LRU capped
+    at `max_keys` (about 250 bytes each), so memory stays bounded however many
+    users show up; the key evicted is the one idle longest.
+    """
+
+    def __init__(self, window=10.0, slots=10, max_keys=100_000):
+        self.window = window
+        self.slots = slots
+        self.slot_seconds = window / slots
+        self.max_keys = max_keys
+        self._zeros = array('I', bytes(4 * slots))
+        self._rings = OrderedDict() # key -> array('I', [last tick, *counts])
+        self.evicted = 0
+
+    def hit(self, key, now=None):
+        """Counts an event for `key` and returns its count within the window."""
+        tick = int((time.monotonic() if now is None else now) / self.slot_seconds)
+        slots = self.slots
+        ring = self._rings.get(key)
+        if ring is None:
+            if len(self._rings) >= self.max_keys:
+                self._rings.popitem(last=False)
+                self.evicted += 1
+            ring = self._rings[key] = array('I', [tick]) + self._zeros
+        else:
+            self._rings.move_to_end(key)
+            last = ring[0]
+            if tick - last >= slots:
+                ring[1:] = self._zeros
+            else:
+                for t in range(last + 1, tick + 1):
+                    ring[1 + t % slots] = 0
+            ring[0] = tick
+        ring[1 + tick % slots] += 1
+        return sum(ring) - tick
+
+    def __len__(self):
+        return len(self._rings)
+
+
+class AutoMod:
+    """Decides what to do about a message; it performs no I/O.
+
+    - A blocked term gets the message deleted.
+    - More than `user_limit` messages from a user within the window gets them
+      timed out.
+    - More than `channel_limit` messages in a channel within the window puts
+      the guild in raid mode for `raid_seconds`. In raid mode the user limit
+      drops to `raid_user_limit`, and offenders who joined less than
+      `new_member_age` seconds ago are kicked instead.
+    """
+
+    def __init__(self, blocklist, window=10.0, user_limit=8, channel_limit=40, raid_user_limit=4,
+                 raid_seconds=300.0, new_member_age=600.0, max_keys=100_000):
+        self.blocklist = blocklist
+        self.window = window
+        self.user_limit = user_limit
+        self.channel_limit = channel_limit
+        self.raid_user_limit = raid_user_limit
+        self.raid_seconds = raid_seconds
+        self.new_member_age = new_member_age
+        self.users = SlidingWindow(window, max_keys=max_keys)
+        self.channels = SlidingWindow(window, max_keys=max_keys)
+        self.raid_until = {} # guild ID -> monotonic end of raid mode
+        self.checked = 0
+        self.raids = 0
+        self.verdicts = defaultdict(int)
+
+    def in_raid(self, guild_id, now=None):
+        return self.raid_until.get(guild_id, 0) > (time.monotonic() if now is None else now)
+
+    def check(self, guild_id, channel_id, user_id, content, joined_at=None, now=None):
+        """A Verdict for the message, or None. `joined_at` is the author's join
+        time (Unix seconds), if known."""
+        self.checked += 1
+        now = time.monotonic() if now is None else now
+        user_count = self.users.hit(guild_id << 64 | user_id, now) # Snowflakes are 64-bit; one int is smaller than a tuple
+        channel_count = self.channels.hit(channel_id, now)
+
+        raid = self.raid_until.get(guild_id, 0) > now
+        if channel_count > self.channel_limit and not raid:
+            self.raid_until[guild_id] = now + self.raid_seconds
+            self.raids += 1
+            raid = True
+            print(f"AutoMod: raid mode in guild {guild_id} ({channel_count} messages in {self.window:g}s in one channel)")
+
+        verdict = None
+        if user_count > (self.raid_user_limit if raid else self.user_limit):
+            new_member = joined_at is not None and time.time() - joined_at < self.new_member_age
+            reason = f"{user_count} messages in {self.window:g}s" + (" during a raid" if raid else "")
+            verdict = Verdict('kick' if raid and new_member else 'timeout', reason)
+        else:
+            term = self.blocklist.search(content)
+            if term is not None:
+                verdict = Verdict('delete', "blocked term")
+        if verdict is not None:
+            self.verdicts[verdict.action] += 1
+        return verdict
+
+    def prune(self, now=None):
+        """Forgets guilds whose raid mode has ended."""
+        now = time.monotonic() if now is None else now
+        for guild_id in [g for g, until in self.raid_until.items() if until <= now]:
+            del self.raid_until[guild_id]
+
+    def stats(self):
+        return {
+            'checked': self.checked,
+            'verdicts': dict(self.verdicts),
+            'raids': self.raids,
+            'active_raids': sum(1 for until in self.raid_until.values() if until > time.monotonic()),
+            'tracked_users': len(self.users),
+            'tracked_channels': len(self.channels),
+            'evicted': self.users.evicted + self.channels.evicted,
+            'blocklist': len(self.blocklist),
+        }
+
+
+class ActionBatcher:
+    """Carries out verdicts in batches, at most once per `interval` seconds.
+
+    Flagged messages are removed with one bulk delete per channel (up to 100
+    messages per call). Each member is timed out or kicked once, no matter how
+    many of their messages were flagged, and not again while the timeout is
+    still running. Every REST call waits on `bucket`, so a raid can't push the
+    bot into Discord's global rate limit.
+    """
+
+    def __init__(self, bucket, interval=1.0, timeout=600.0):
+        self.bucket = bucket
+        self.interval = interval
+        self.timeout = timeout
+        self._deletes = defaultdict(dict) # channel -> {message ID: message}
+        self._punish = {} # (guild ID, member ID) -> (member, action, reason)
+        self._recent = {} # (guild ID, member ID) -> monotonic time their punishment runs out
+        self._task = None
+        self.calls = 0
+
+    def add(self, message, verdict):
+        self._deletes[message.channel][message.id] = message
+        if verdict.action in ('timeout', 'kick'):
+            key = (message.guild.id, message.author.id)
+            queued = self._punish.get(key)
+            if self._recent.get(key, 0) <= time.monotonic() and (queued is None or verdict.action == 'kick'):
+                self._punish[key] = (message.author, verdict.action, verdict.reason)
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    def pending(self):
+        return sum(len(messages) for messages in self._deletes.values()) + len(self._punish)
+
+    @property
+    def busy(self):
+        return self._task is not None
+
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+        finally:
+            self._task = None
+        if self.pending(): # Flagged while this batch was going out
+            self._task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _call(self, action, coro_factory):
+        await self.bucket.acquire()
+        self.calls += 1
+        try:
+            await coro_factory()
+            AUTOMOD_ACTIONS.inc(action=action, result='ok')
+        except discord.NotFound:
+            AUTOMOD_ACTIONS.inc(action=action, result='gone') # Already deleted, or the member already left
+        except discord.HTTPException as e:
+            AUTOMOD_ACTIONS.inc(action=action, result='failed')
+            print(f"AutoMod: {action} failed: {e}")
+
+    async def flush(self):
+        deletes, self._deletes = self._deletes, defaultdict(dict)
+        punish, self._punish = self._punish, {}
+        now = time.monotonic()
+        for key in [k for k, until in self._recent.items() if until <= now]:
+            del self._recent[key]
+
+        # Punish first: a timed-out or kicked member stops adding to the pile.
+        for key, (member, action, reason) in punish.items():
+            self._recent[key] = now + self.timeout
+            if action == 'kick':
+                await self._call('kick', lambda: member.kick(reason=f"AutoMod: {reason}"))
+            else:
+                until = datetime.timedelta(seconds=self.timeout)
+                await self._call('timeout', lambda: member.timeout(until, reason=f"AutoMod: {reason}"))
+        for channel, messages in deletes.items():
+            messages = list(messages.values())
+            for i in range(0, len(messages), 100):
+                chunk = messages[i:i + 100]
+                await self._call('delete', lambda: channel.delete_messages(chunk, reason="AutoMod"))
+
+    def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,91 @@
+import gc
+import sys
+
+import discord
+
+# What the gateway cache keeps, per profile. The members intent stays on in every
+# profile (moderation and member events need it); only what is *kept* changes.
+#   full    - every member of every guild, chunked at startup (discord.py's default)
+#   lean    - only members currently in voice (music needs them), small message cache
+#   minimal - no member or message cache at all; everything is resolved on demand
+PROFILES = {
+    'full': {'members': 'all', 'chunk': True, 'max_messages': 1000},
+    'lean': {'members': 'voice', 'chunk': False, 'max_messages': 100},
+    'minimal': {'members': 'none', 'chunk': False, 'max_messages': None},
+}
+
+
+def cache_options(profile):
+    """Bot keyword arguments for a cache profile name."""
+    try:
+        settings = PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unknown cache profile {profile!r} (choose from {', '.join(PROFILES)})")
+    if settings['members'] == 'all':
+        flags = discord.MemberCacheFlags.all()
+    else:
+        flags = discord.MemberCacheFlags.none()
+        flags.voice = settings['members'] == 'voice'
+    return {
+        'member_cache_flags': flags,
+        'chunk_guilds_at_startup': settings['chunk'],
+        'max_messages': settings['max_messages'],
+    }
+
+
+def cache_counts(bot):
+    """Number of objects held by each part of the gateway cache."""
+    guilds = bot.guilds
+    return {
+        'guilds': len(guilds),
+        'members': sum(len(g._members) for g in guilds),
+        'users': len(bot.users),
+        'voice_states': sum(len(g._voice_states) for g in guilds),
+        'channels': sum(len(g._channels) for g in guilds),
+        'roles': sum(len(g._roles) for g in guilds),
+        'emojis': len(bot.emojis),
+        'messages': len(bot.cached_messages),
+    }
+
+
+def _shallow(obj):
+    """Size of an object plus its direct attribute values (slots or __dict__)."""
+    size = sys.getsizeof(obj)
+    names = getattr(obj, '__dict__', None) or ()
+    if not names:
+        for cls in type(obj).__mro__:
+            names = (*names, *getattr(cls, '__slots__', ()))
+    for name in names:
+        value = getattr(obj, name, None)
+        if isinstance(value, (str, bytes, tuple, list, dict, int, float)):
+            size += sys.getsizeof(value)
+    return size
+
+
+def estimate_bytes(objects, sample=200):
+    """Approximate memory of a collection, extrapolated from a sample of its items."""
+    objects = list(objects)
+    if not objects:
+        return 0
+    step = max(1, len(objects) // sample)
+    picked = objects[::step]
+    return sum(_shallow(o) for o in picked) * len(objects) // len(picked)
+
+
+def cache_bytes(bot):
+    """Approximate memory per cache category (members, users, messages)."""
+    return {
+        'members': estimate_bytes(m for g in bot.guilds for m in g._members.values()),
+        'users': estimate_bytes(bot.users),
+        'messages': estimate_bytes(bot.cached_messages),
+    }
+
+
+def live_objects(prefix='discord.'):
+    """Counts of live objects per discord.py type, from the garbage collector's view."""
+    counts = {}
+    for obj in gc.get_objects():
+        cls = type(obj)
+        if str(getattr(cls, '__module__', '')).startswith(prefix):
+            counts[cls.__name__] = counts.get(cls.__name__, 0) + 1
+    return dict(sorted(counts.items(), key=lambda item: -item[1]))
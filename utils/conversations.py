@@ -0,0 +1,127 @@
+import time
+from collections import OrderedDict, deque
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token for English)."""
+    return len(text) // 4 + 1
+
+
+class Conversation:
+    """One conversation's recent turns, kept under a token budget.
+
+    Turns that no longer fit are folded into a short running summary instead
+    of being resent in full on every call.
+    """
+
+    __slots__ = ('turns', 'summary', 'tokens', 'last_used')
+
+    SUMMARY_CHARS = 600
+
+    def __init__(self):
+        self.turns = deque() # (role, text, tokens)
+        self.summary = ""
+        self.tokens = 0
+        self.last_used = time.monotonic()
+
+    def add(self, role, text):
+        tokens = estimate_tokens(text)
+        self.turns.append((role, text, tokens))
+        self.tokens += tokens
+
+    def trim(self, budget):
+        # Always keep the latest exchange, drop whole user/model pairs from the front.
+        # The summary gets at most a quarter of the budget (~4 chars per token).
+        summary_chars = min(self.SUMMARY_CHARS, budget)
+        while self.tokens > budget and len(self.turns) > 2:
+            for _ in range(2):
+                role, text, _ = self.turns.popleft()
+                self.summary = f"{self.summary} {role}: {text[:160]}"[-summary_chars:].strip()
+            self.tokens = sum(turn[2] for turn in self.turns) + estimate_tokens(self.summary)
+
+    def history(self):
+        """Turns in the Gemini `contents` format."""
+        return [{'role': role, 'parts': [text]} for role, text, _ in self.turns]
+
+    def prompt(self, query):
+        """The new user message, carrying the summary of trimmed turns if there is one."""
+        if not self.summary:
+            return query
+        return f"(Earlier in this conversation, summarized: {self.summary})\n\n{query}"
+
+
+class ConversationStore:
+    """Conversations keyed per channel (or per user/guild), with LRU + idle-TTL
+    eviction and hard caps on the number of sessions and total tokens held."""
+
+    def __init__(self, scope='channel', token_budget=2000, max_sessions=1000, ttl=3600, max_total_tokens=500000):
+        self.scope = scope
+        self.token_budget = token_budget
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_total_tokens = max_total_tokens
+        self._sessions = OrderedDict() # key -> Conversation, least recently used first
+        self.total_tokens = 0
+        self.evicted = 0
+
+    def key_for(self, ctx):
+        guild_id = ctx.guild.id if ctx.guild else None
+        if self.scope == 'user':
+            return (guild_id, ctx.author.id)
+        if self.scope == 'guild':
+            return (guild_id,)
+        return (guild_id, ctx.channel.id)
+
+    def get(self, key):
+        self._expire()
+        conversation = self._sessions.get(key)
+        if conversation is None:
+            conversation = self._sessions[key] = Conversation()
+        self._sessions.move_to_end(key)
+        conversation.last_used = time.monotonic()
+        return conversation
+
+    def record(self, key, query, reply):
+        """Appends an exchange and trims/evicts to stay within the budgets."""
+        conversation = self.get(key)
+        before = conversation.tokens
+        conversation.add('user', query)
+        conversation.add('model', reply)
+        conversation.trim(self.token_budget)
+        self.total_tokens += conversation.tokens - before
+        self._shrink()
+
+    def forget(self, key):
+        conversation = self._sessions.pop(key, None)
+        if conversation is None:
+            return False
+        self.total_tokens -= conversation.tokens
+        return True
+
+    def _drop_oldest(self):
+        _, conversation = self._sessions.popitem(last=False)
+        self.total_tokens -= conversation.tokens
+        self.evicted += 1
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        while self._sessions and next(iter(self._sessions.values())).last_used < cutoff:
+            self._drop_oldest()
+
+    def _shrink(self):
+        # Never evict the conversation that was just used (it's last in order).
+        while len(self._sessions) > 1 and (
+            len(self._sessions) > self.max_sessions or self.total_tokens > self.max_total_tokens
+        ):
+            self._drop_oldest()
+
+    def stats(self):
+        self._expire()
+        sizes = [c.tokens for c in self._sessions.values()]
+        return {
+            'sessions': len(sizes),
+            'total_tokens': self.total_tokens,
+            'avg_tokens': self.total_tokens / len(sizes) if sizes else 0,
+            'max_tokens': max(sizes, default=0),
+            'evicted': self.evicted,
+        }
@@ -0,0 +1,248 @@
+import threading
+import time
+
+import discord
+import numpy as np
+
+SAMPLE_RATE = 48000
+CHANNELS = 2
+FRAME_SAMPLES = 960 # 20 ms at 48 kHz
+FRAME_BYTES = FRAME_SAMPLES * CHANNELS * 2 # s16le
+FRAME_BUDGET = 0.020
+
+
+# --- Effects ---
+# Each effect takes and returns a float32 array of shape (samples, 2).
+
+class BassBoost:
+    """Adds a low-passed copy of the signal back in, using a linear-phase FIR
+    applied by FFT overlap-save (one rfft/irfft pair per frame)."""
+
+    TAPS = 1025
+    FFT_SIZE = 2048 # >= FRAME_SAMPLES + TAPS - 1
+    _kernel = None
+
+    def __init__(self, cutoff=150.0, gain=1.5):
+        if BassBoost._kernel is None or BassBoost._kernel[0] != (cutoff, gain):
+            n = np.arange(self.TAPS) - (self.TAPS - 1) / 2
+            lowpass = np.sinc(2 * cutoff / SAMPLE_RATE * n) * np.hamming(self.TAPS)
+            lowpass /= lowpass.sum()
+            kernel = gain * lowpass
+            kernel[(self.TAPS - 1) // 2] += 1.0 # dry signal, delayed to line up with the filtered one
+            BassBoost._kernel = ((cutoff, gain), np.fft.rfft(kernel, self.FFT_SIZE).astype(np.complex64)[:, None])
+        self.spectrum = BassBoost._kernel[1]
+        self.history = np.zeros((self.TAPS - 1, CHANNELS), dtype=np.float32)
+
+    def process(self, x):
+        block = np.concatenate((self.history, x))
+        self.history = block[-(self.TAPS - 1):]
+        y = np.fft.irfft(np.fft.rfft(block, self.FFT_SIZE, axis=0) * self.spectrum, self.FFT_SIZE, axis=0)
+        return y[self.TAPS - 1:self.TAPS - 1 + len(x)].astype(np.float32)
+
+
+class AutoPan:
+    """'8D' audio: slowly sweeps the signal around the stereo field."""
+
+    def __init__(self, period=8.0):
+        self.step = 2 * np.pi / (period * SAMPLE_RATE)
+        self.phase = 0.0
+
+    def process(self, x):
+        phases = self.phase + self.step * np.arange(len(x), dtype=np.float64)
+        self.phase = (self.phase + self.step * len(x)) % (2 * np.pi)
+        # Equal-power pan, scaled so the centre position is unity gain.
+        angle = (np.sin(phases) + 1) * (np.pi / 4)
+        gains = np.empty((len(x), CHANNELS), dtype=np.float32)
+        gains[:, 0] = np.cos(angle) * np.sqrt(2)
+        gains[:, 1] = np.sin(angle) * np.sqrt(2)
+        return x * gains
+
+
+# name -> (playback rate, effect factories). A rate other than 1.0 resamples,
+# which shifts speed and pitch together (nightcore/vaporwave style).
+FILTERS = {
+    'none': (1.0, ()),
+    'nightcore': (1.25, ()),
+    'bass': (1.0, (BassBoost,)),
+    'vaporwave': (0.8, ()),
+    '8d': (1.0, (AutoPan,)),
+}
+
+
+# --- Audio source ---
+
+class FrameTimer:
+    """Mixin timing the voice player's reads. discord.py reads one frame every
+    20 ms; how far each gap lands from that is the send jitter."""
+
+    jitter_observer = None # Called with each gap's deviation in seconds
+    _last_read = None
+
+    def _tick(self):
+        now = time.perf_counter()
+        last, self._last_read = self._last_read, now
+        if last is not None and self.jitter_observer is not None:
+            gap = now - last
+            if gap < 1.0: # Longer gaps are pauses, not jitter
+                self.jitter_observer(abs(gap - FRAME_BUDGET))
+
+
+class FilteredPCMSource(FrameTimer, discord.AudioSource):
+    """Replacement for PCMVolumeTransformer that also runs the audio filters.
+
+    Every 20 ms frame from the wrapped PCM source goes through vectorized NumPy
+    ops, so switching filters takes effect on the next frame without restarting
+    FFmpeg or losing the playback position. `gain` is the track's loudness
+    normalization; it is folded into the volume multiply.
+
+    set_filter is called from the event loop while the audio thread reads, so
+    it only stages the new filter; read() swaps it in before the next frame.
+    """
+
+    def __init__(self, original, volume=1.0, filter_name='none', gain=1.0):
+        if original.is_opus():
+            raise discord.ClientException('FilteredPCMSource needs a PCM source.')
+        self.original = original
+        self.volume = volume
+        self.gain = gain
+        self.rate = 1.0
+        self.effects = []
+        self._pending = np.zeros((0, CHANNELS), dtype=np.float32) # resampler input backlog
+        self._pos = 0.0 # fractional read position into _pending
+        self._ended = False
+        self.samples_read = 0 # per channel, from the original source
+
+        self.frames = 0
+        self.process_time = 0.0
+        self.max_frame_time = 0.0
+        self._staged = None # filter name waiting for the audio thread
+        self._lock = threading.Lock()
+        self.filter_name = filter_name
+        self._apply_filter(filter_name)
+
+    def set_filter(self, name):
+        """Switches to filter `name` from the next frame on."""
+        if name not in FILTERS:
+            raise KeyError(name) # Here, not later on the audio thread
+        with self._lock:
+            self._staged = name
+        self.filter_name = name
+
+    @property
+    def speed(self):
+        """Seconds of the track played per second, under the selected filter."""
+        return FILTERS[self.filter_name][0]
+
+    def _apply_filter(self, name):
+        rate, factories = FILTERS[name]
+        self.rate = rate
+        self.effects = [factory() for factory in factories]
+        if rate == 1.0:
+            # Drop the resampler backlog (under two frames) so the cheap
+            # pass-through path can take over again.
+            self._pending = self._pending[:0]
+            self._pos = 0.0
+
+    def is_opus(self):
+        return False
+
+    def cleanup(self):
+        self.original.cleanup()
+
+    def _read_pcm(self):
+        data = self.original.read()
+        if len(data) != FRAME_BYTES:
+            self._ended = True
+            return None
+        self.samples_read += FRAME_SAMPLES
+        return np.frombuffer(data, dtype=np.int16).reshape(-1, CHANNELS).astype(np.float32)
+
+    def _resample(self):
+        """Linear-interpolation resampler producing exactly one output frame."""
+        needed = int(self._pos + self.rate * (FRAME_SAMPLES - 1)) + 2
+        while len(self._pending) < needed:
+            chunk = self._read_pcm()
+            if chunk is None:
+                return None
+            self._pending = np.concatenate((self._pending, chunk))
+
+        positions = self._pos + self.rate * np.arange(FRAME_SAMPLES)
+        index = positions.astype(np.int64)
+        frac = (positions - index).astype(np.float32)[:, None]
+        out = self._pending[index] * (1 - frac) + self._pending[index + 1] * frac
+
+        advance = self._pos + self.rate * FRAME_SAMPLES
+        consumed = int(advance)
+        self._pos = advance - consumed
+        self._pending = self._pending[consumed:]
+        return out
+
+    def read(self):
+        if self._ended:
+            return b''
+        self._tick()
+        start = time.perf_counter()
+        if self._staged is not None:
+            with self._lock:
+                name, self._staged = self._staged, None
+            self._apply_filter(name)
+
+        scale = self.volume * self.gain
+        if self.rate == 1.0 and not len(self._pending):
+            if not self.effects and scale == 1.0:
+                data = self.original.read() # Nothing to do: pass the frame through untouched
+                self.samples_read += FRAME_SAMPLES
+                self._account(start)
+                return data
+            x = self._read_pcm()
+        else:
+            x = self._resample()
+        if x is None:
+            return b''
+
+        for effect in self.effects:
+            x = effect.process(x)
+        if scale != 1.0:
+            x *= scale
+        np.clip(x, -32768, 32767, out=x)
+        data = x.astype(np.int16).tobytes()
+        self._account(start)
+        return data
+
+    def _account(self, start):
+        elapsed = time.perf_counter() - start
+        self.frames += 1
+        self.process_time += elapsed
+        if elapsed > self.max_frame_time:
+            self.max_frame_time = elapsed
+
+    @property
+    def elapsed(self):
+        """Seconds of the original stream played so far. Counted in input samples,
+        so it stays right under nightcore/vaporwave speed changes."""
+        return (self.samples_read - len(self._pending) + self._pos) / SAMPLE_RATE
+
+    @property
+    def avg_frame_time(self):
+        return self.process_time / self.frames if self.frames else 0.0
+
+
+class PassthroughOpusSource(FrameTimer, discord.FFmpegOpusAudio):
+    """Copies the stream's own Opus packets to Discord: no decode, no volume
+    scaling in Python and no libopus re-encode. Only usable when the track is
+    already Opus and nothing needs to touch the samples."""
+
+    def __init__(self, source, **kwargs):
+        super().__init__(source, codec='copy', **kwargs)
+        self.frames = 0
+
+    def read(self):
+        self._tick()
+        packet = super().read()
+        if packet:
+            self.frames += 1
+        return packet
+
+    @property
+    def elapsed(self):
+        return self.frames * FRAME_BUDGET # one 20 ms Opus frame per packet
@@ -0,0 +1,172 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from utils.metrics import REGISTRY
+
+_local = threading.local()
+
+EXTRACTIONS = REGISTRY.counter('extractions_total', "yt-dlp extractions by outcome", ('result',))
+EXTRACTION_SECONDS = REGISTRY.histogram('extraction_seconds', "yt-dlp extraction run time")
+EXTRACTION_WAIT = REGISTRY.histogram('extraction_wait_seconds', "Time an extraction waited for a worker")
+
+
+def _options_key(options):
+    return tuple(sorted((k, repr(v)) for k, v in options.items()))
+
+
+def _extract(options, query):
+    """Runs inside a pool worker. Each worker thread/process keeps its own YoutubeDL
+    per option set, since a YoutubeDL instance is not safe to share across threads."""
+    instances = getattr(_local, 'instances', None)
+    if instances is None:
+        instances = _local.instances = {}
+    key = _options_key(options)
+    ytdl = instances.get(key)
+    if ytdl is None:
+        # Imported here, in the worker, so startup never pays for yt-dlp's import.
+        import yt_dlp
+        ytdl = instances[key] = yt_dlp.YoutubeDL(options)
+    info = ytdl.extract_info(query, download=False)
+    # sanitize_info makes the result plain JSON data, cheap to pickle back from a process.
+    return ytdl.sanitize_info(info) if info is not None else None
+
+
+class _Job:
+    __slots__ = ('key', 'query', 'options', 'guild_id', 'future', 'enqueued_at', 'started_at')
+
+    def __init__(self, key, query, options, guild_id, future):
+        self.key = key
+        self.query = query
+        self.options = options
+        self.guild_id = guild_id
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+
+
+class ExtractionService:
+    """Bounded yt-dlp worker pool shared by every guild.
+
+    Pending extractions are queued per guild and dispatched round-robin, so a
+    burst of searches from one guild cannot hold up the others, and no guild
+    runs more than `per_guild` extractions at once. Identical requests that are
+    already queued or running share a single extraction.
+    """
+
+    def __init__(self, options, workers=4, per_guild=2, mode='thread'):
+        self.options = options
+        self.workers = workers
+        self.per_guild = per_guild
+        self.mode = mode
+        if mode == 'process':
+            self.executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ytdl')
+
+        self._pending = {} # Guild ID -> deque of waiting jobs
+        self._rotation = deque() # Guild IDs with waiting jobs, in round-robin order
+        self._running = {} # Guild ID -> running job count
+        self._active = 0
+        self._inflight = {} # (query, options) -> job
+
+        self.completed = 0
+        self.failed = 0
+        self.deduplicated = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def extract(self, query, guild_id=None, options=None):
+        """Extracts `query` on the pool and returns the (sanitized) info dict."""
+        options = options or self.options
+        key = (query.strip(), _options_key(options))
+
+        job = self._inflight.get(key)
+        if job is not None:
+            self.deduplicated += 1
+            EXTRACTIONS.inc(result='shared')
+        else:
+            job = _Job(key, query, options, guild_id, asyncio.get_running_loop().create_future())
+            self._inflight[key] = job
+            if guild_id not in self._pending:
+                self._pending[guild_id] = deque()
+                self._rotation.append(guild_id)
+            self._pending[guild_id].append(job)
+            self._pump()
+
+        # Shield so one caller giving up does not cancel the extraction for the others.
+        return await asyncio.shield(job.future)
+
+    def _next_job(self):
+        for _ in range(len(self._rotation)):
+            guild_id = self._rotation[0]
+            self._rotation.rotate(-1)
+            if self._running.get(guild_id, 0) < self.per_guild:
+                jobs = self._pending[guild_id]
+                job = jobs.popleft()
+                if not jobs:
+                    del self._pending[guild_id]
+                    self._rotation.remove(guild_id)
+                return job
+        return None # Every waiting guild is at its concurrency cap
+
+    def _pump(self):
+        while self._active < self.workers:
+            job = self._next_job()
+            if job is None:
+                return
+
+            job.started_at = time.monotonic()
+            wait = job.started_at - job.enqueued_at
+            EXTRACTION_WAIT.observe(wait)
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self._active += 1
+            self._running[job.guild_id] = self._running.get(job.guild_id, 0) + 1
+
+            loop = job.future.get_loop()
+            task = loop.run_in_executor(self.executor, _extract, job.options, job.query)
+            task.add_done_callback(lambda task, job=job: self._finish(job, task))
+
+    def _finish(self, job, task):
+        self._active -= 1
+        self._running[job.guild_id] -= 1
+        if not self._running[job.guild_id]:
+            del self._running[job.guild_id]
+        self._inflight.pop(job.key, None)
+        EXTRACTION_SECONDS.observe(time.monotonic() - job.started_at)
+
+        if task.cancelled():
+            EXTRACTIONS.inc(result='cancelled')
+            job.future.cancel()
+        elif task.exception() is not None:
+            self.failed += 1
+            EXTRACTIONS.inc(result='error')
+            if not job.future.done():
+                job.future.set_exception(task.exception())
+        else:
+            self.completed += 1
+            EXTRACTIONS.inc(result='ok')
+            if not job.future.done():
+                job.future.set_result(task.result())
+        self._pump()
+
+    def stats(self):
+        started = self.completed + self.failed + self._active
+        return {
+            'mode': self.mode,
+            'workers': self.workers,
+            'running': self._active,
+            'queued': sum(len(jobs) for jobs in self._pending.values()),
+            'waiting_guilds': len(self._rotation),
+            'completed': self.completed,
+            'failed': self.failed,
+            'deduplicated': self.deduplicated,
+            'avg_wait': self.total_wait / started if started else 0.0,
+            'max_wait': self.max_wait,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
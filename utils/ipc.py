@@ -0,0 +1,176 @@
+import asyncio
+import itertools
+import json
+
+
+async def _send(writer, message):
+    writer.write(json.dumps(message).encode() + b'\n')
+    await writer.drain()
+
+
+class IPCHub:
+    """Runs in the cluster launcher. Relays a request from one cluster to every
+    connected cluster and returns all their replies to the requester.
+
+    Wire format: one JSON object per line over localhost TCP.
+    """
+
+    def __init__(self, port, secret, timeout=5.0):
+        self.port = port
+        self.secret = secret
+        self.timeout = timeout
+        self.clusters = {} # cluster ID -> StreamWriter
+        self._pending = {} # call ID -> {cluster ID: result}, filled by replies
+        self._waiters = {} # call ID -> Future set once every cluster replied
+        self._ids = itertools.count()
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', self.port)
+
+    async def _handle(self, reader, writer):
+        cluster_id = None
+        try:
+            hello = json.loads(await reader.readline())
+            if hello.get('op') != 'hello' or hello.get('secret') != self.secret:
+                return
+            cluster_id = hello['cluster']
+            self.clusters[cluster_id] = writer
+            while line := await reader.readline():
+                message = json.loads(line)
+                if message['op'] == 'request':
+                    asyncio.create_task(self._relay(writer, message))
+                elif message['op'] == 'reply':
+                    self._collect(message['id'], cluster_id, message['result'])
+        except (ConnectionError, json.JSONDecodeError):
+            pass
+        finally:
+            if cluster_id is not None and self.clusters.get(cluster_id) is writer:
+                del self.clusters[cluster_id]
+            writer.close()
+
+    def _collect(self, call_id, cluster_id, result):
+        results = self._pending.get(call_id)
+        if results is None:
+            return # Arrived after the timeout
+        results[cluster_id] = result
+        if len(results) >= len(self.clusters) and not self._waiters[call_id].done():
+            self._waiters[call_id].set_result(None)
+
+    async def _relay(self, origin, message):
+        call_id = next(self._ids)
+        self._pending[call_id] = {}
+        self._waiters[call_id] = asyncio.get_running_loop().create_future()
+        call = {'op': 'call', 'id': call_id, 'command': message['command'], 'args': message.get('args', {})}
+        for writer in list(self.clusters.values()):
+            try:
+                await _send(writer, call)
+            except ConnectionError:
+                pass
+        try:
+            await asyncio.wait_for(self._waiters[call_id], timeout=message.get('timeout', self.timeout))
+        except asyncio.TimeoutError:
+            pass # Answer with whatever arrived; missing clusters are simply absent
+        results = self._pending.pop(call_id)
+        del self._waiters[call_id]
+        try:
+            await _send(origin, {'op': 'response', 'id': message['id'], 'results': results})
+        except ConnectionError:
+            pass
+
+    def close(self):
+        if self.server:
+            self.server.close()
+
+
+class IPCClient:
+    """A cluster's connection to the launcher's IPCHub.
+
+    `register` exposes a local async handler under a command name;
+    `broadcast` runs a command on every cluster and returns
+    {cluster ID: result}.
+    """
+
+    def __init__(self, cluster_id, port, secret):
+        self.cluster_id = cluster_id
+        self.port = port
+        self.secret = secret
+        self.handlers = {}
+        self._requests = {} # request ID -> Future
+        self._ids = itertools.count()
+        self._writer = None
+        self._task = None
+
+    def register(self, command, handler):
+        self.handlers[command] = handler
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_connection('127.0.0.1', self.port)
+                await _send(self._writer, {'op': 'hello', 'cluster': self.cluster_id, 'secret': self.secret})
+                while line := await reader.readline():
+                    message = json.loads(line)
+                    if message['op'] == 'call':
+                        asyncio.create_task(self._answer(message))
+                    elif message['op'] == 'response':
+                        future = self._requests.pop(message['id'], None)
+                        if future and not future.done():
+                            future.set_result({int(k): v for k, v in message['results'].items()})
+            except (ConnectionError, OSError, json.JSONDecodeError) as e:
+                print(f"IPC: connection to launcher lost ({e}), retrying...")
+            self._writer = None
+            await asyncio.sleep(2)
+
+    async def _answer(self, message):
+        handler = self.handlers.get(message['command'])
+        try:
+            result = await handler(**message['args']) if handler else None
+        except Exception as e:
+            result = {'error': str(e)}
+        if self._writer:
+            await _send(self._writer, {'op': 'reply', 'id': message['id'], 'result': result})
+
+    async def broadcast(self, command, timeout=5.0, **args):
+        if self._writer is None:
+            # Launcher unreachable: answer for this cluster alone rather than failing.
+            return await LocalIPC.broadcast(self, command, timeout, **args)
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._requests[request_id] = future
+        await _send(self._writer, {'op': 'request', 'id': request_id, 'command': command, 'args': args, 'timeout': timeout})
+        try:
+            return await asyncio.wait_for(future, timeout=timeout + 1)
+        finally:
+            self._requests.pop(request_id, None)
+
+    def close(self):
+        if self._task:
+            self._task.cancel()
+        if self._writer:
+            self._writer.close()
+
+
+class LocalIPC:
+    """Stand-in used when the bot runs as a single process: a broadcast just
+    runs the local handler, so cluster-wide commands work unchanged."""
+
+    def __init__(self):
+        self.cluster_id = 0
+        self.handlers = {}
+
+    def register(self, command, handler):
+        self.handlers[command] = handler
+
+    async def start(self):
+        pass
+
+    async def broadcast(self, command, timeout=5.0, **args):
+        handler = self.handlers.get(command)
+        return {self.cluster_id: await handler(**args) if handler else None}
+
+    def close(self):
+        pass
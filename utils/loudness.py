@@ -0,0 +1,246 @@
+import os
+import shlex
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utils.dsp import CHANNELS, SAMPLE_RATE
+from utils.metrics import REGISTRY
+
+LOUDNESS_ANALYSES = REGISTRY.counter('loudness_analyses_total', "Track loudness analyses", ('result',))
+LOUDNESS_SECONDS = REGISTRY.histogram('loudness_analysis_seconds', "Time to analyze one track",
+                                      buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0))
+
+# ITU-R BS.1770 K-weighting at 48 kHz: a high shelf (head effects) then the RLB high-pass.
+SHELF = ((1.53512485958697, -2.69169618940638, 1.19839281085285), (1.0, -1.69065929318241, 0.73248077421585))
+HIGHPASS = ((1.0, -2.0, 1.0), (1.0, -1.99004745483398, 0.99007225036621))
+BLOCK = SAMPLE_RATE // 10 # 100 ms: gating blocks are 400 ms with 75% overlap, i.e. four of these
+CHUNK_SECONDS = 10 # decoded and measured at a time
+
+
+def k_weights(n):
+    """Per-rfft-bin factors turning |X|^2 of an n-sample block into its K-weighted
+    mean square (Parseval, with the filters' squared magnitude response)."""
+    z = np.exp(-2j * np.pi * np.fft.rfftfreq(n))
+    response = np.ones_like(z)
+    for b, a in (SHELF, HIGHPASS):
+        response *= (b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)
+    weights = np.abs(response) ** 2 * 2 / (n * n)
+    weights[0] /= 2 # DC and Nyquist appear once in the full spectrum
+    if n % 2 == 0:
+        weights[-1] /= 2
+    return weights
+
+
+class LoudnessMeter:
+    """Integrated loudness (LUFS) and sample peak of a stereo stream, fed in
+    float chunks of any length.
+
+    Filtering is done in the frequency domain: every 100 ms block is one row
+    of a batched rfft, weighted by the K-filter's response and summed, so a
+    10-second chunk is a handful of NumPy calls. Only one number per block is
+    kept (about 50 KB for an hour), then gated per BS.1770 at the end.
+    """
+
+    _weights = k_weights(BLOCK)
+
+    def __init__(self):
+        self._carry = np.zeros((0, CHANNELS), dtype=np.float32)
+        self._blocks = [] # arrays of per-100ms mean squares, summed over channels
+        self.peak = 0.0
+        self.seconds = 0.0
+
+    def add(self, pcm):
+        """`pcm`: float32 array of shape (samples, 2) in [-1, 1]."""
+        if not len(pcm):
+            return
+        self.peak = max(self.peak, float(np.abs(pcm).max()))
+        self.seconds += len(pcm) / SAMPLE_RATE
+        x = np.concatenate((self._carry, pcm)) if len(self._carry) else pcm
+        count = len(x) // BLOCK
+        self._carry = x[count * BLOCK:]
+        if count:
+            spectrum = np.fft.rfft(x[:count * BLOCK].reshape(count, BLOCK, CHANNELS), axis=1)
+            power = spectrum.real ** 2 + spectrum.imag ** 2
+            self._blocks.append(np.einsum('bfc,f->b', power, self._weights))
+
+    def integrated(self):
+        """Gated integrated loudness in LUFS, or None for silence / under 400 ms."""
+        if not self._blocks:
+            return None
+        z = np.concatenate(self._blocks)
+        if len(z) < 4:
+            return None
+        gating = np.convolve(z, np.full(4, 0.25), mode='valid') # 400 ms blocks, 100 ms apart
+        loudness = -0.691 + 10 * np.log10(np.maximum(gating, 1e-20))
+        gating, loudness = gating[loudness > -70], loudness[loudness > -70] # Absolute gate
+        if not len(gating):
+            return None
+        relative = -0.691 + 10 * np.log10(gating.mean()) - 10
+        return float(-0.691 + 10 * np.log10(gating[loudness > relative].mean()))
+
+
+def decode(path, before_options='', max_seconds=None, ffmpeg='ffmpeg'):
+    """Yields float32 (samples, 2) chunks of a file or URL decoded by FFmpeg.
+
+    FFmpeg runs single-threaded at lowered priority, and only decodes as fast
+    as the chunks are consumed (the pipe applies back-pressure).
+    """
+    args = [ffmpeg, '-nostdin', '-v', 'error', '-threads', '1', *shlex.split(before_options or ''), '-i', path]
+    if max_seconds:
+        args += ['-t', str(max_seconds)]
+    args += ['-vn', '-ac', str(CHANNELS), '-ar', str(SAMPLE_RATE), '-f', 's16le', 'pipe:1']
+    kwargs = {}
+    if os.name == 'posix':
+        kwargs['preexec_fn'] = lambda: os.nice(10)
+    elif hasattr(subprocess, 'BELOW_NORMAL_PRIORITY_CLASS'):
+        kwargs['creationflags'] = subprocess.BELOW_NORMAL_PRIORITY_CLASS
+    process = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, **kwargs)
+    try:
+        chunk_bytes = SAMPLE_RATE * CHUNK_SECONDS * CHANNELS * 2
+        while True:
+            data = process.stdout.read(chunk_bytes)
+            if not data:
+                break
+            data = data[:len(data) // (CHANNELS * 2) * (CHANNELS * 2)]
+            yield np.frombuffer(data, dtype=np.int16).reshape(-1, CHANNELS).astype(np.float32) / 32768
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with {process.returncode}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+class LoudnessAnalyzer:
+    """Works out each track's normalization gain once, in the background.
+
+    One worker thread analyzes one track at a time. After each chunk it sleeps
+    in proportion to the time the chunk took, waiting for FFmpeg's output
+    included, so it is busy at most `cpu_share` of the time. FFmpeg blocks on
+    the full pipe during those sleeps, which keeps decoding within the share
+    too. At most `backlog` tracks wait; others are skipped and come back on a
+    later play. Results are stored by video ID in the track cache, which survives
+    restarts.
+
+    The gain brings a track to `target` LUFS. Boosts are limited to
+    `max_boost` dB and to what the track's peak allows without clipping.
+    """
+
+    def __init__(self, store, target=-14.0, max_boost=6.0, max_seconds=600, backlog=50, cpu_share=0.5,
+                 decoder=decode, memory_size=4096):
+        self.store = store
+        self.target = target
+        self.max_boost = max_boost
+        self.max_seconds = max_seconds
+        self.backlog = backlog
+        self.cpu_share = cpu_share
+        self.decoder = decoder
+        self.memory_size = memory_size
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='loudness')
+        self._gains = OrderedDict() # video ID -> gain in dB (None: analyzed, no usable result)
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._stopped = False
+        self.analyzed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.audio_seconds = 0.0
+        self.busy_seconds = 0.0
+
+    def gain_db(self, video_id):
+        """The stored gain for a track in dB, or None if it hasn't been analyzed."""
+        if not video_id:
+            return None
+        with self._lock:
+            if video_id in self._gains:
+                self._gains.move_to_end(video_id)
+                return self._gains[video_id]
+        row = self.store.get_loudness(video_id)
+        gain = row['gain'] if row else None
+        if row is not None:
+            self._remember(video_id, gain)
+        return gain
+
+    def _remember(self, video_id, gain):
+        with self._lock:
+            self._gains[video_id] = gain
+            self._gains.move_to_end(video_id)
+            while len(self._gains) > self.memory_size:
+                self._gains.popitem(last=False)
+
+    def request(self, video_id, path, before_options=''):
+        """Queues a track for analysis unless it's known, queued or the backlog is full."""
+        if not video_id or not path:
+            return False
+        with self._lock:
+            if video_id in self._gains or video_id in self._queued:
+                return False
+            if len(self._queued) >= self.backlog:
+                self.skipped += 1
+                return False
+            self._queued.add(video_id)
+        if self.store.get_loudness(video_id) is not None:
+            with self._lock:
+                self._queued.discard(video_id)
+            return False
+        self.executor.submit(self._run, video_id, path, before_options)
+        return True
+
+    def _run(self, video_id, path, before_options):
+        start = time.perf_counter()
+        try:
+            meter = LoudnessMeter()
+            chunk_start = time.perf_counter()
+            for chunk in self.decoder(path, before_options, self.max_seconds): # Reading waits on FFmpeg
+                if self._stopped:
+                    return
+                meter.add(chunk)
+                if self.cpu_share < 1.0:
+                    time.sleep((time.perf_counter() - chunk_start) * (1 / self.cpu_share - 1))
+                chunk_start = time.perf_counter()
+            if self._stopped:
+                return
+            lufs = meter.integrated()
+            gain = self.gain_for(lufs, meter.peak)
+            self.store.put_loudness(video_id, lufs, meter.peak, gain)
+            self._remember(video_id, gain)
+            self.analyzed += 1
+            self.audio_seconds += meter.seconds
+            LOUDNESS_ANALYSES.inc(result='ok')
+        except Exception as e:
+            self.failed += 1
+            LOUDNESS_ANALYSES.inc(result='error')
+            print(f"Loudness analysis failed for {video_id}: {e}")
+        finally:
+            elapsed = time.perf_counter() - start
+            self.busy_seconds += elapsed
+            LOUDNESS_SECONDS.observe(elapsed)
+            with self._lock:
+                self._queued.discard(video_id)
+
+    def gain_for(self, lufs, peak):
+        """dB to apply to reach the target, or None when there is nothing to measure (silence)."""
+        if lufs is None:
+            return None
+        gain = min(self.target - lufs, self.max_boost)
+        if peak > 0:
+            gain = min(gain, -20 * np.log10(peak)) # Don't boost into clipping
+        return round(float(gain), 2)
+
+    def stats(self):
+        return {
+            'analyzed': self.analyzed,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'queued': len(self._queued),
+            'speed': self.audio_seconds / self.busy_seconds if self.busy_seconds else 0.0, # x real time
+        }
+
+    def shutdown(self):
+        self._stopped = True # A running analysis stops at its next chunk, without storing anything
+        self.executor.shutdown(wait=False, cancel_futures=True)
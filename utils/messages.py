@@ -0,0 +1,95 @@
+import time
+
+DISCORD_LIMIT = 2000
+FENCE = "```"
+
+
+def _fence_state(text, fence=None):
+    """Returns the fence header (e.g. '```python') still open at the end of `text`."""
+    for line in text.split('\n'):
+        if line.strip().startswith(FENCE):
+            fence = None if fence else line.strip()
+    return fence
+
+
+def _best_cut(text, room, fence):
+    """Where to split `text` so the first part fits in `room` characters.
+
+    Prefers, in order: right after a code block closes, a paragraph break,
+    a line break, a space. Only breaks that keep at least half the room count.
+    """
+    window = text[:room]
+    floor = room // 2
+
+    # End of a closing fence line that fits in the window.
+    position, best = 0, -1
+    for line in window.split('\n')[:-1]:
+        position += len(line) + 1
+        if line.strip().startswith(FENCE):
+            fence = None if fence else line.strip()
+            if fence is None:
+                best = position
+    if best >= floor:
+        return best
+
+    for separator in ('\n\n', '\n', ' '):
+        cut = window.rfind(separator)
+        if cut >= floor:
+            return cut + len(separator)
+    return room
+
+
+def split_message(text, limit=DISCORD_LIMIT):
+    """Splits text into Discord-sized messages without breaking code blocks.
+
+    A block that has to be split is closed at the end of one message and
+    reopened (same language) at the start of the next.
+    """
+    pieces = []
+    fence = None
+    while text:
+        prefix = f"{fence}\n" if fence else ""
+        room = limit - len(prefix) - len(FENCE) - 1 # keep space to close a fence
+        if len(text) <= room:
+            chunk, text = text, ""
+        else:
+            cut = _best_cut(text, room, fence)
+            chunk, text = text[:cut], text[cut:]
+        body = prefix + chunk
+        fence = _fence_state(chunk, fence)
+        if fence and text:
+            body = body.rstrip('\n') + "\n" + FENCE
+        pieces.append(body)
+    return pieces
+
+
+class StreamingReply:
+    """A reply that grows while it is generated.
+
+    Posts as soon as there is text, then edits in place at most once per
+    `interval` seconds (Discord allows ~5 edits per 5 s per channel) and
+    continues in follow-up messages once the text outgrows one message.
+    """
+
+    def __init__(self, channel, render=split_message, interval=1.2):
+        self.channel = channel
+        self.render = render
+        self.interval = interval
+        self.messages = [] # [message, content] per posted piece
+        self.last_update = 0.0
+        self.requests = 0 # REST calls made
+
+    async def update(self, text, final=False):
+        if not text or (not final and self.messages and time.monotonic() - self.last_update < self.interval):
+            return
+        for i, piece in enumerate(self.render(text)):
+            if i < len(self.messages):
+                message, content = self.messages[i]
+                if content != piece:
+                    await message.edit(content=piece)
+                    self.messages[i][1] = piece
+                    self.requests += 1
+            else:
+                self.messages.append([await self.channel.send(piece), piece])
+                self.requests += 1
+        self.last_update = time.monotonic()
@@ -0,0 +1,256 @@
+import asyncio
+import bisect
+import threading
+import time
+
+# Latency buckets in seconds, from a fast command up to a slow yt-dlp extraction.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labelnames, labels):
+    return tuple(str(labels.get(name, '')) for name in labelnames)
+
+
+def _format_labels(labelnames, key, extra=None):
+    pairs = list(zip(labelnames, key))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    """Monotonic count, optionally split by labels."""
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def total(self):
+        return sum(self.values.values())
+
+    def samples(self):
+        for key, value in list(self.values.items()):
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class Gauge(Counter):
+    """Value that goes up and down. `function` makes it read its value at scrape time."""
+    kind = 'gauge'
+
+    def __init__(self, name, help, labelnames=(), function=None):
+        super().__init__(name, help, labelnames)
+        self.function = function
+
+    def set(self, value, **labels):
+        self.values[_label_key(self.labelnames, labels)] = value
+
+    def samples(self):
+        if self.function is not None:
+            yield self.name, '', self.function()
+        else:
+            yield from super().samples()
+
+
+class _HistogramSeries:
+    __slots__ = ('counts', 'sum', 'count', 'max')
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+
+class Histogram:
+    """Bucketed distribution. Observing is a bisect and two additions, so it is
+    cheap enough for per-frame voice timings.
+
+    Voice timings are observed from discord.py's audio threads, so a new
+    series can appear while the event loop reads the others: creation takes
+    a lock, and readers iterate over a snapshot of `series`.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def _series(self):
+        with self._lock:
+            return list(self.series.items())
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        series = self.series.get(key)
+        if series is None:
+            with self._lock:
+                series = self.series.get(key)
+                if series is None:
+                    series = self.series[key] = _HistogramSeries(len(self.buckets) + 1)
+        series.counts[bisect.bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+        if value > series.max:
+            series.max = value
+
+    def _select(self, labels):
+        positions = [(self.labelnames.index(name), str(value)) for name, value in labels.items()]
+        return [
+            series for key, series in self._series()
+            if all(key[i] == value for i, value in positions)
+        ]
+
+    def label_values(self, name):
+        i = self.labelnames.index(name)
+        return sorted({key[i] for key, _ in self._series()})
+
+    def count(self, **labels):
+        return sum(series.count for series in self._select(labels))
+
+    def quantile(self, q, **labels):
+        """Estimated quantile (the upper bound of its bucket) over every series
+        matching `labels`."""
+        chosen = self._select(labels)
+        total = sum(s.count for s in chosen)
+        if not total:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for i, bound in enumerate(self.buckets):
+            seen += sum(s.counts[i] for s in chosen)
+            if seen >= rank:
+                return bound
+        return max(s.max for s in chosen)
+
+    def samples(self):
+        for key, series in self._series():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float('inf')), series.counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                yield f'{self.name}_bucket', _format_labels(self.labelnames, key, ('le', le)), cumulative
+            labels = _format_labels(self.labelnames, key)
+            yield f'{self.name}_sum', labels, series.sum
+            yield f'{self.name}_count', labels, series.count
+
+
+class Registry:
+    """Named metrics. Asking again for an existing name returns the same metric,
+    so a reloaded cog keeps counting into the series it had."""
+
+    def __init__(self, prefix='antigravity_'):
+        self.prefix = prefix
+        self.metrics = {}
+
+    def _get(self, cls, name, *args, **kwargs):
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = cls(self.prefix + name, *args, **kwargs)
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._get(Counter, name, help, labelnames)
+
+    def gauge(self, name, help, labelnames=(), function=None):
+        gauge = self._get(Gauge, name, help, labelnames)
+        if function is not None:
+            gauge.function = function
+        return gauge
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help, labelnames, buckets)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a sleeping task. Anything beyond a
+    few milliseconds means something is blocking the loop."""
+
+    def __init__(self, registry=REGISTRY, interval=0.5):
+        self.interval = interval
+        self.histogram = registry.histogram(
+            'event_loop_lag_seconds', "Event loop wake-up delay",
+            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+        )
+        self.last = 0.0
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.last = max(0.0, time.perf_counter() - start - self.interval)
+            self.histogram.observe(self.last)
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+
+class MetricsServer:
+    """Minimal HTTP endpoint serving GET /metrics for Prometheus to scrape."""
+
+    def __init__(self, registry=REGISTRY, host='127.0.0.1', port=9100):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        print(f"Metrics: serving http://{self.host}:{self.port}/metrics")
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), timeout=5)
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b'\r\n', b'\n', b''):
+                pass # Headers are not needed
+            parts = request.decode('latin-1').split()
+            if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+                status, body = '200 OK', self.registry.render().encode()
+            else:
+                status, body = '404 Not Found', b'Not found\n'
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        if self.server:
+            self.server.close()
@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+import discord
+
+from utils.metrics import REGISTRY
+
+PANEL_CALLS = REGISTRY.counter('panel_calls_total', "Now-playing panel REST calls", ('kind',))
+PANEL_REQUESTS = REGISTRY.counter('panel_refresh_requests_total', "Now-playing panel refresh requests")
+
+
+def progress_bar(position, duration, width=18):
+    """'1:23 ▬▬▬▬🔘▬▬▬▬▬ 3:45', or a live marker when the length is unknown."""
+    elapsed = time.strftime('%M:%S' if position < 3600 else '%H:%M:%S', time.gmtime(max(0, position)))
+    if not duration:
+        return f"🔴 LIVE {elapsed}"
+    filled = min(width - 1, int(width * position / duration))
+    total = time.strftime('%M:%S' if duration < 3600 else '%H:%M:%S', time.gmtime(duration))
+    return f"{elapsed} {'▬' * filled}🔘{'▬' * (width - 1 - filled)} {total}"
+
+
+class NowPlayingPanel:
+    """A guild's single now-playing message, edited in place.
+
+    `request()` only marks the panel stale. A stale panel is re-rendered after
+    `debounce` seconds, so a burst of changes (skip, volume, loop...) costs one
+    edit. Edits to the same message are at least `min_interval` apart, keeping
+    well inside the per-channel message route limit, and every panel draws from
+    `bucket`, the bot-wide budget for panel edits. A button press on the panel
+    can answer its interaction by editing the panel itself; `covered()` then
+    drops the pending edit.
+
+    `key()` sums up what the panel shows apart from its progress bar. A request
+    whose key matches the message's costs nothing, unless it asks for
+    `progress`.
+    """
+
+    def __init__(self, channel, render, bucket, message=None, key=None, debounce=1.0, min_interval=5.0):
+        self.channel = channel
+        self.render = render # -> dict of Message.edit/send kwargs, or None to skip
+        self.bucket = bucket
+        self.key = key
+        self.message = message
+        self.debounce = debounce
+        self.min_interval = min_interval
+        self._stale = False
+        self._progress = False
+        self._shown = None # key() of what the message shows, if known
+        self._task = None
+        self._last_publish = 0.0
+        self.requests = 0
+        self.sends = 0
+        self.edits = 0
+        self.responses = 0 # Edits done by interaction responses
+        self.unchanged = 0 # Requests dropped because the message already shows the state
+
+    def request(self, progress=False):
+        self.requests += 1
+        PANEL_REQUESTS.inc()
+        self._stale = True
+        self._progress = self._progress or progress
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    @property
+    def coalesced(self):
+        return max(0, self.requests - self.sends - self.edits - self.responses - self.unchanged)
+
+    def covered(self):
+        """The panel was just re-rendered by an interaction response: nothing is stale."""
+        self.responses += 1
+        PANEL_CALLS.inc(kind='response')
+        self._shown = self.key() if self.key else None
+        self._stale = self._progress = False
+
+    def _unchanged(self):
+        return not self._progress and self.key is not None and self.key() == self._shown
+
+    async def _run(self):
+        try:
+            while self._stale:
+                await asyncio.sleep(max(self.debounce, self._last_publish + self.min_interval - time.monotonic()))
+                if not self._stale:
+                    break # Covered by an interaction response meanwhile
+                if self._unchanged():
+                    self._stale = False
+                    self.unchanged += 1
+                    PANEL_CALLS.inc(kind='unchanged')
+                    continue
+                await self.bucket.acquire()
+                self._stale = self._progress = False # Requests from here on need another round
+                await self._publish()
+        finally:
+            self._task = None
+
+    async def _publish(self):
+        self._last_publish = time.monotonic()
+        try:
+            shown = self.key() if self.key else None
+            content = self.render()
+            if content is None:
+                return
+            if self.message is not None:
+                try:
+                    self.message = await self.message.edit(**content)
+                    self.edits += 1
+                    self._shown = shown
+                    PANEL_CALLS.inc(kind='edit')
+                    return
+                except discord.NotFound:
+                    self.message = None # Deleted: post a new panel
+            self.message = await self.channel.send(**content)
+            self._shown = shown
+            self.sends += 1
+            PANEL_CALLS.inc(kind='send')
+        except Exception as e:
+            PANEL_CALLS.inc(kind='failed')
+            print(f"Now-playing panel update failed in channel {self.channel.id}: {e}")
+
+    def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
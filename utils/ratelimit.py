@@ -0,0 +1,86 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def delay(self, tokens=1):
+        """Seconds until `tokens` would be available."""
+        self._refill()
+        return max(0.0, (tokens - self.tokens) / self.rate)
+
+    async def acquire(self, tokens=1):
+        while not self.try_acquire(tokens):
+            await asyncio.sleep(self.delay(tokens))
+
+
+class QueueFull(Exception):
+    """Raised when a RequestLimiter already has `max_waiting` callers queued."""
+
+
+class RequestLimiter:
+    """Admission control for an expensive backend: a token bucket for request
+    rate, a semaphore for concurrency, and a bounded wait queue in front of both
+    so overload turns into fast rejections instead of an ever-growing backlog."""
+
+    def __init__(self, rate, burst, concurrency, max_waiting):
+        self.bucket = TokenBucket(rate, burst)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.concurrency = concurrency
+        self.max_waiting = max_waiting
+        self.waiting = 0
+        self.active = 0
+        self.rejected = 0
+        self.served = 0
+
+    def full(self):
+        return self.waiting >= self.max_waiting
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.full():
+            self.rejected += 1
+            raise QueueFull()
+        self.waiting += 1
+        try:
+            await self.bucket.acquire()
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.served += 1
+            self.semaphore.release()
+
+    def stats(self):
+        return {
+            'active': self.active,
+            'concurrency': self.concurrency,
+            'waiting': self.waiting,
+            'max_waiting': self.max_waiting,
+            'served': self.served,
+            'rejected': self.rejected,
+        }
@@ -0,0 +1,57 @@
+import re
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """LRU + TTL cache of AI replies to context-free prompts.
+
+    Prompts are keyed by their words in order, ignoring case, punctuation and
+    spacing, so "What is love?" and "what is love" share an answer. Word order
+    and repeats are kept: reordering words can change the question.
+    """
+
+    def __init__(self, max_entries=500, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict() # key -> (reply, stored_at)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(prompt):
+        return " ".join(re.findall(r"\w+", prompt.lower()))
+
+    def _lookup(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now - entry[1] > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def get(self, prompt):
+        reply = self._lookup(self._key(prompt), time.monotonic())
+        if reply is not None:
+            self.hits += 1
+            return reply
+        self.misses += 1
+        return None
+
+    def put(self, prompt, reply):
+        key = self._key(prompt)
+        self._entries[key] = (reply, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,216 @@
+import asyncio
+import re
+import threading
+import weakref
+
+SPOTIFY_URL = re.compile(
+    r'^(?:spotify:(track|album|playlist):|https?://open\.spotify\.com/(?:intl-[a-z-]+/)?(track|album|playlist)/)([A-Za-z0-9]+)'
+)
+# Words that mark a different recording than the studio track, unless the Spotify title has them too.
+VERSION_WORDS = {'live', 'cover', 'karaoke', 'remix', 'instrumental', 'nightcore', 'slowed', 'sped', 'reverb', '8d', 'acoustic'}
+
+
+def parse_spotify_url(text):
+    """('track' | 'album' | 'playlist', ID) for a Spotify link or URI, else None."""
+    match = SPOTIFY_URL.match(text.strip())
+    if not match:
+        return None
+    return match.group(1) or match.group(2), match.group(3)
+
+
+def spotify_track_id(web_url):
+    """The track ID of an open.spotify.com track URL (used by unmatched placeholders)."""
+    parsed = parse_spotify_url(web_url or '')
+    return parsed[1] if parsed and parsed[0] == 'track' else None
+
+
+def track_url(track_id):
+    return f"https://open.spotify.com/track/{track_id}"
+
+
+def search_query(artists, name):
+    """'Artist - Title', without the ' - Remastered 2011' / '(feat. X)' tails that YouTube titles rarely carry."""
+    name = re.sub(r'\s*[\(\[][^\)\]]*[\)\]]', '', name).split(' - ')[0].strip() or name
+    return f"{artists} - {name}" if artists else name
+
+
+def _words(text):
+    return set(re.findall(r'\w+', (text or '').lower()))
+
+
+def match_score(track, candidate):
+    """0..1: how likely a YouTube search result is the Spotify track.
+
+    Half of it is duration (full marks within 2s, nothing beyond 30s off), half
+    is the share of the track's artist and title words found in the result's
+    title and channel. Live/cover/remix-style versions the track isn't are
+    penalized.
+    """
+    duration, other = track.get('duration'), candidate.get('duration')
+    if duration and other:
+        duration_score = max(0.0, 1.0 - max(0.0, abs(duration - other) - 2) / 28)
+    else:
+        duration_score = 0.5 # Unknown: neither for nor against
+    wanted = _words(track['query'])
+    found = _words(f"{candidate.get('title')} {candidate.get('channel') or candidate.get('uploader') or ''}")
+    title_score = len(wanted & found) / len(wanted) if wanted else 0.0
+    penalty = 0.3 if (found - wanted) & VERSION_WORDS else 0.0
+    return 0.5 * duration_score + 0.5 * title_score - penalty
+
+
+def _track(data):
+    """Spotify track object -> the fields matching needs. None for local files and removed tracks."""
+    if not data or data.get('is_local') or not data.get('id'):
+        return None
+    artists = ", ".join(artist['name'] for artist in data.get('artists') or [])
+    return {
+        'id': data['id'],
+        'title': data['name'],
+        'artists': artists,
+        'query': search_query(artists, data['name']),
+        'duration': round(data['duration_ms'] / 1000) if data.get('duration_ms') else None,
+    }
+
+
+class SpotipyBackend:
+    """Spotify Web API through spotipy (client credentials). The library is only
+    imported, and the client created, on first use; calls run in worker threads.
+
+    `fetch` returns one page: {'name', 'total', 'tracks', 'next'}, where `next`
+    is the offset of the following page or None. Playlists page by 100, albums by 50.
+    """
+
+    PLAYLIST_FIELDS = 'items(track(id,name,duration_ms,is_local,artists(name))),next'
+
+    def __init__(self, client_id, client_secret):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                import spotipy
+                from spotipy.oauth2 import SpotifyClientCredentials
+                auth = SpotifyClientCredentials(client_id=self.client_id, client_secret=self.client_secret)
+                self._client = spotipy.Spotify(auth_manager=auth, requests_timeout=10, retries=3)
+            return self._client
+
+    def _fetch(self, kind, item_id, offset):
+        sp = self._get_client()
+        if kind == 'track':
+            track = _track(sp.track(item_id))
+            return {'name': track['title'] if track else None, 'total': 1, 'tracks': [track] if track else [], 'next': None}
+        if kind == 'album':
+            if offset == 0:
+                album = sp.album(item_id)
+                name, page = album['name'], album['tracks']
+            else:
+                name, page = None, sp.album_tracks(item_id, limit=50, offset=offset)
+            items = page['items']
+        else:
+            if offset == 0:
+                playlist = sp.playlist(item_id, fields=f"name,tracks(total,{self.PLAYLIST_FIELDS})", additional_types=('track',))
+                name, page = playlist['name'], playlist['tracks']
+            else:
+                name = None
+                page = sp.playlist_items(item_id, fields=f"total,{self.PLAYLIST_FIELDS}", limit=100, offset=offset,
+                                         additional_types=('track',))
+            items = [item.get('track') for item in page['items']]
+        tracks = [track for track in map(_track, items) if track]
+        return {
+            'name': name,
+            'total': page.get('total'),
+            'tracks': tracks,
+            'next': offset + len(items) if page.get('next') and items else None,
+        }
+
+    async def fetch(self, kind, item_id, offset=0):
+        return await asyncio.to_thread(self._fetch, kind, item_id, offset)
+
+
+class FakeSpotifyBackend:
+    """Local stand-in (SPOTIFY_BACKEND=fake): every album/playlist has `size`
+    made-up tracks, served in pages of 100 after `latency` seconds."""
+
+    def __init__(self, size=500, latency=0.2, page_size=100):
+        self.size = size
+        self.latency = latency
+        self.page_size = page_size
+        self.calls = 0
+
+    async def fetch(self, kind, item_id, offset=0):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        count = 1 if kind == 'track' else self.size
+        tracks = []
+        for i in range(offset, min(count, offset + self.page_size)):
+            artists = f"Stub Artist {i % 7}"
+            title = f"Song {item_id} {i}"
+            tracks.append({'id': f"{item_id}x{i}", 'title': title, 'artists': artists,
+                           'query': search_query(artists, title), 'duration': 150 + i % 90})
+        following = offset + self.page_size
+        return {'name': f"Stub {kind} {item_id}", 'total': count, 'tracks': tracks, 'next': following if following < count else None}
+
+
+class SpotifyMatcher:
+    """Finds the YouTube video for a Spotify track.
+
+    Known mappings come from the track cache's Spotify table, so a repeated
+    import never searches. Otherwise one flat `ytsearchN:` extraction lists
+    candidates with their durations, which are scored by `match_score`; the
+    best one is stored if it clears `min_score`. Background matching for an
+    import should hold its guild's `slots` (`concurrency` of them) and use its
+    own extraction queue, so it never keeps more than that many searches ahead
+    of users' own requests, and one guild's import doesn't hold up another's.
+    """
+
+    def __init__(self, backend, extractor, track_cache, search_options, concurrency=3, candidates=5, min_score=0.45):
+        self.backend = backend
+        self.extractor = extractor
+        self.track_cache = track_cache
+        self.search_options = search_options
+        self.concurrency = concurrency
+        self._slots = weakref.WeakValueDictionary() # guild ID -> Semaphore, while anyone holds or waits for it
+        self.candidates = candidates
+        self.min_score = min_score
+        self.searches = 0
+        self.cache_hits = 0
+        self.failed = 0
+
+    def slots(self, guild_id):
+        """The guild's semaphore for background matching."""
+        semaphore = self._slots.get(guild_id)
+        if semaphore is None:
+            semaphore = self._slots[guild_id] = asyncio.Semaphore(self.concurrency)
+        return semaphore
+
+    def known(self, track_ids):
+        """Spotify ID -> (web_url, video_id) for every already-matched track."""
+        found = self.track_cache.get_spotify(track_ids)
+        self.cache_hits += len(found)
+        return found
+
+    async def match(self, track, guild_id=None):
+        """(web_url, video_id) of the best match, or None."""
+        known = self.track_cache.get_spotify([track['id']])
+        if known:
+            self.cache_hits += 1
+            return known[track['id']]
+        self.searches += 1
+        data = await self.extractor.extract(f"ytsearch{self.candidates}:{track['query']}", guild_id, options=self.search_options)
+        scored = [(match_score(track, entry), entry) for entry in (data or {}).get('entries') or [] if entry and entry.get('id')]
+        if not scored:
+            self.failed += 1
+            return None
+        score, best = max(scored, key=lambda pair: pair[0])
+        if score < self.min_score:
+            self.failed += 1
+            return None
+        web_url = best.get('webpage_url') or f"https://www.youtube.com/watch?v={best['id']}"
+        self.track_cache.put_spotify(track['id'], web_url, best['id'], score)
+        return web_url, best['id']
+
+    def stats(self):
+        return {'searches': self.searches, 'cache_hits': self.cache_hits, 'failed': self.failed}
@@ -0,0 +1,183 @@
+import asyncio
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueStateStore:
+    """Crash-safe per-guild player state in SQLite (WAL).
+
+    A guild's state is a small JSON player record (current song, position,
+    history, settings), rewritten on every save, plus one row per queued song
+    that only changes when the queue does. `snapshot(guild_id)` returns
+    `(player, edits)`, with the queue's row edits since the last snapshot:
+    ('put', seq, song), ('delete', seq) or ('reset', [(seq, song), ...]).
+
+    Guilds are marked dirty as their queue changes; a write happens at most once
+    per `delay` seconds and covers every guild that changed since the last one,
+    in a single transaction. Snapshots are taken on the event loop; writes run
+    one at a time, in order, on a worker thread.
+    """
+
+    def __init__(self, path, snapshot, delay=2.0, max_age=7 * 24 * 60 * 60):
+        self.path = path
+        self.snapshot = snapshot
+        self.delay = delay
+        self.max_age = max_age
+        self._dirty = set()
+        self._parked = {} # guild ID -> final snapshot of a queue evicted from memory
+        self._task = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='queue-state')
+        self.writes = 0
+        self.guilds_written = 0
+        self.rows_written = 0
+        self.last_write_time = 0.0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS players ("
+            "guild_id INTEGER PRIMARY KEY, data TEXT NOT NULL, saved_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tracks ("
+            "guild_id INTEGER NOT NULL, seq REAL NOT NULL, video_id TEXT, title TEXT, web_url TEXT, "
+            "duration REAL, requester_id INTEGER, PRIMARY KEY (guild_id, seq)) WITHOUT ROWID"
+        )
+        self._db.commit()
+
+    def load(self, guild_id):
+        """The guild's last saved state, or None (also for states older than
+        max_age): the player record with its `saved_at` time and `queue`, the
+        songs as (seq, *Song.compact()) rows in order."""
+        if guild_id in self._parked:
+            # Evicted moments ago: its last edits go to disk first (rare, and small).
+            self._writer.submit(self._write, {guild_id: self._parked.pop(guild_id)}).result()
+        with self._lock:
+            row = self._db.execute("SELECT data, saved_at FROM players WHERE guild_id = ?", (guild_id,)).fetchone()
+            if row is None:
+                return None
+            if time.time() - row[1] > self.max_age:
+                self._delete(guild_id)
+                self._db.commit()
+                return None
+            tracks = self._db.execute(
+                "SELECT seq, video_id, title, web_url, duration, requester_id FROM tracks "
+                "WHERE guild_id = ? ORDER BY seq", (guild_id,)
+            ).fetchall()
+        state = json.loads(row[0])
+        state['saved_at'] = row[1]
+        state['queue'] = tracks
+        return state
+
+    def mark_dirty(self, guild_id):
+        if self._closed:
+            return
+        self._dirty.add(guild_id)
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    def park(self, guild_id, state):
+        """Saves the final snapshot of a queue that is being dropped from memory."""
+        self._parked[guild_id] = state
+        self.mark_dirty(guild_id)
+
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self._task = None
+        await self.flush()
+
+    def _collect(self):
+        dirty, self._dirty = self._dirty, set()
+        parked, self._parked = self._parked, {}
+        states = {}
+        for guild_id in dirty:
+            state = self.snapshot(guild_id)
+            # A queue still (or again) in memory is newer than its parked state.
+            states[guild_id] = state if state is not None else parked.get(guild_id)
+        return states
+
+    async def flush(self):
+        """Writes every dirty guild now."""
+        states = self._collect()
+        if states:
+            await asyncio.wrap_future(self._writer.submit(self._write, states))
+
+    def _delete(self, guild_id):
+        self._db.execute("DELETE FROM players WHERE guild_id = ?", (guild_id,))
+        self._db.execute("DELETE FROM tracks WHERE guild_id = ?", (guild_id,))
+
+    def _write(self, states):
+        start = time.perf_counter()
+        now = time.time()
+        rows = 0
+        with self._lock:
+            for guild_id, state in states.items():
+                if not state:
+                    self._delete(guild_id)
+                    continue
+                player, edits = state
+                self._db.execute(
+                    "INSERT OR REPLACE INTO players (guild_id, data, saved_at) VALUES (?, ?, ?)",
+                    (guild_id, json.dumps(player, separators=(',', ':')), now)
+                )
+                # Consecutive edits of a kind go in one executemany; their order is kept.
+                for kind, group in itertools.groupby(edits, key=lambda edit: edit[0]):
+                    if kind == 'delete':
+                        deleted = [(guild_id, seq) for _, seq in group]
+                        self._db.executemany("DELETE FROM tracks WHERE guild_id = ? AND seq = ?", deleted)
+                        rows += len(deleted)
+                        continue
+                    if kind == 'reset':
+                        self._db.execute("DELETE FROM tracks WHERE guild_id = ?", (guild_id,))
+                        songs = [row for _, reset in group for row in reset]
+                    else:
+                        songs = [(seq, song) for _, seq, song in group]
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [(guild_id, seq, *song.compact()) for seq, song in songs]
+                    )
+                    rows += len(songs)
+            self._db.commit()
+        self.writes += 1
+        self.guilds_written += len(states)
+        self.rows_written += rows
+        self.last_write_time = time.perf_counter() - start
+
+    def stats(self):
+        with self._lock:
+            saved = self._db.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+        return {
+            'saved_guilds': saved,
+            'dirty': len(self._dirty),
+            'writes': self.writes,
+            'guilds_written': self.guilds_written,
+            'rows_written': self.rows_written,
+            'last_write_ms': self.last_write_time * 1000,
+        }
+
+    def close(self, guild_ids=()):
+        """Writes `guild_ids` and whatever else is dirty (synchronously), then
+        closes the database. Later changes are ignored."""
+        self._closed = True
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self._dirty.update(guild_ids)
+        states = self._collect()
+        if states:
+            self._writer.submit(self._write, states)
+        self._writer.shutdown(wait=True)
+        with self._lock:
+            self._db.close()
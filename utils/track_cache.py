@@ -0,0 +1,255 @@
+import sqlite3
+import threading
+import json
+import time
+import os
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+
+# Fields of a yt-dlp info dict that playback and embeds actually use.
+TRACK_FIELDS = ('id', 'title', 'url', 'webpage_url', 'duration', 'thumbnail', 'uploader')
+
+# Used when the stream URL carries no explicit expiry (non-YouTube hosts).
+DEFAULT_STREAM_TTL = 60 * 60
+
+
+def normalize_query(query):
+    """Maps equivalent user input onto one cache key."""
+    query = query.strip()
+    parsed = urlparse(query)
+    if parsed.scheme in ('http', 'https') and parsed.netloc:
+        host = parsed.netloc.lower()
+        if host.startswith('www.') or host.startswith('m.') or host.startswith('music.'):
+            host = host.split('.', 1)[1]
+        if host == 'youtube.com' and parsed.path == '/watch':
+            video_id = parse_qs(parsed.query).get('v', [None])[0]
+            if video_id:
+                return f"url:https://www.youtube.com/watch?v={video_id}"
+        if host == 'youtu.be' and parsed.path.strip('/'):
+            return f"url:https://www.youtube.com/watch?v={parsed.path.strip('/')}"
+        return f"url:{query}"
+    return "q:" + " ".join(query.lower().split())
+
+
+def stream_expiry(stream_url, now=None):
+    """Best guess at when a resolved stream URL stops working."""
+    now = now or time.time()
+    try:
+        expire = parse_qs(urlparse(stream_url).query).get('expire', [None])[0]
+        if expire:
+            return float(expire)
+    except (TypeError, ValueError):
+        pass
+    return now + DEFAULT_STREAM_TTL
+
+
+def stream_expired(expires_at, margin=300, now=None):
+    """True if a stream URL expiring at `expires_at` is gone (or will be within
+    `margin` seconds). Tracks without a stream URL use an `expires_at` of 0."""
+    now = now or time.time()
+    return (expires_at or 0) - margin <= now
+
+
+class TrackCache:
+    """Two-tier (memory LRU + SQLite) cache of extracted track metadata.
+
+    Both normalized search queries and webpage URLs resolve to the same entry,
+    so `!play never gonna give you up` and a pasted link share one extraction.
+    Metadata lives for `ttl` seconds; the stream URL inside it expires much
+    sooner and is tracked separately via `expires_at`.
+    """
+
+    def __init__(self, path, memory_size=512, ttl=7 * 24 * 60 * 60):
+        self.path = path
+        self.memory_size = memory_size
+        self.ttl = ttl
+        self._memory = OrderedDict() # cache key -> track info
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stale = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tracks ("
+            "web_url TEXT PRIMARY KEY, data TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS aliases ("
+            "key TEXT PRIMARY KEY, web_url TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS aliases_by_url ON aliases (web_url)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS spotify ("
+            "spotify_id TEXT PRIMARY KEY, web_url TEXT NOT NULL, video_id TEXT NOT NULL, "
+            "score REAL NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS loudness ("
+            "video_id TEXT PRIMARY KEY, lufs REAL, peak REAL NOT NULL, gain REAL, analyzed_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    # --- Memory tier ---
+
+    def _remember(self, key, info):
+        self._memory[key] = info
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    # --- Public API ---
+
+    def get(self, query):
+        """Returns cached track info for a query/URL, or None.
+
+        The returned info may carry an expired stream URL; check it with
+        `stream_expired` and re-resolve through `webpage_url` if so.
+        """
+        key = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            info = self._memory.get(key)
+            if info is not None and now - info['stored_at'] < self.ttl:
+                self._memory.move_to_end(key)
+                self._count(info, now)
+                return info
+
+            row = self._db.execute(
+                "SELECT t.data, t.stored_at FROM aliases a JOIN tracks t ON t.web_url = a.web_url "
+                "WHERE a.key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] >= self.ttl:
+                self._memory.pop(key, None)
+                self.misses += 1
+                return None
+
+            info = json.loads(row[0])
+            self._remember(key, info)
+            self.disk_hits += 1
+            self._count(info, now)
+            return info
+
+    def _count(self, info, now):
+        if stream_expired(info['expires_at'], now=now):
+            self.stale += 1
+        else:
+            self.hits += 1
+
+    def put(self, query, data):
+        """Stores a yt-dlp info dict under the query and its webpage URL.
+
+        Returns the slimmed-down info dict that was cached.
+        """
+        info = {field: data.get(field) for field in TRACK_FIELDS}
+        info['webpage_url'] = info['webpage_url'] or data.get('original_url') or query
+        info['acodec'] = data.get('acodec')
+        info['expires_at'] = stream_expiry(info['url']) if info['url'] else 0
+        info['stored_at'] = time.time()
+
+        keys = {normalize_query(query), normalize_query(info['webpage_url'])}
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO tracks (web_url, data, stored_at) VALUES (?, ?, ?)",
+                (info['webpage_url'], json.dumps(info), info['stored_at'])
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO aliases (key, web_url) VALUES (?, ?)",
+                [(key, info['webpage_url']) for key in keys]
+            )
+            self._db.commit()
+            for key in keys:
+                self._remember(key, info)
+        return info
+
+    def invalidate(self, query):
+        """Drops the entry a query/URL points to, along with all its aliases."""
+        key = normalize_query(query)
+        with self._lock:
+            row = self._db.execute("SELECT web_url FROM aliases WHERE key = ?", (key,)).fetchone()
+            info = self._memory.get(key)
+            web_url = row[0] if row else (info['webpage_url'] if info else None)
+            if web_url is None:
+                return False
+            self._db.execute("DELETE FROM aliases WHERE web_url = ?", (web_url,))
+            self._db.execute("DELETE FROM tracks WHERE web_url = ?", (web_url,))
+            self._db.commit()
+            for cached_key in [k for k, v in self._memory.items() if v['webpage_url'] == web_url]:
+                del self._memory[cached_key]
+            return True
+
+    # --- Spotify matches ---
+
+    def get_spotify(self, spotify_ids):
+        """Spotify track ID -> (web_url, video_id) for the IDs that have a stored match.
+        The mapping doesn't expire: a video's identity outlives its stream URLs."""
+        found = {}
+        spotify_ids = list(spotify_ids)
+        with self._lock:
+            for i in range(0, len(spotify_ids), 500): # SQLite caps bound parameters per statement
+                chunk = spotify_ids[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT spotify_id, web_url, video_id FROM spotify WHERE spotify_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                found.update((spotify_id, (web_url, video_id)) for spotify_id, web_url, video_id in rows)
+        return found
+
+    def put_spotify(self, spotify_id, web_url, video_id, score):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO spotify (spotify_id, web_url, video_id, score, stored_at) VALUES (?, ?, ?, ?, ?)",
+                (spotify_id, web_url, video_id, score, time.time())
+            )
+            self._db.commit()
+
+    # --- Loudness ---
+
+    def get_loudness(self, video_id):
+        """{'lufs', 'peak', 'gain'} measured for a video, or None. `lufs` and
+        `gain` are None for a track that turned out silent."""
+        with self._lock:
+            row = self._db.execute("SELECT lufs, peak, gain FROM loudness WHERE video_id = ?", (video_id,)).fetchone()
+        return {'lufs': row[0], 'peak': row[1], 'gain': row[2]} if row else None
+
+    def put_loudness(self, video_id, lufs, peak, gain):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO loudness (video_id, lufs, peak, gain, analyzed_at) VALUES (?, ?, ?, ?, ?)",
+                (video_id, lufs, peak, gain, time.time())
+            )
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM aliases")
+            self._db.execute("DELETE FROM tracks")
+            self._db.commit()
+            self._memory.clear()
+
+    def stats(self):
+        with self._lock:
+            stored = self._db.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+            spotify = self._db.execute("SELECT COUNT(*) FROM spotify").fetchone()[0]
+            loudness = self._db.execute("SELECT COUNT(*) FROM loudness").fetchone()[0]
+        lookups = self.hits + self.stale + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'stale': self.stale,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.stale) / lookups if lookups else 0.0,
+            'memory_entries': len(self._memory),
+            'stored_tracks': stored,
+            'spotify_matches': spotify,
+            'loudness_analyzed': loudness,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()